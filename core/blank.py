@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+空白页检测
+"""
+
+import fitz  # PyMuPDF
+import numpy as np
+from core.parallel import map_shards, progress_reporter
+
+
+# 空白页检测：渲染DPI、忽略的页边比例（扫描阴影）、比背景暗多少算墨迹、
+# 墨迹像素占比上限、灰度标准差上限，以及连通的墨迹区域达到多少像素（按
+# BLANK_RENDER_DPI 渲染）即视为内容（如只有页码或简短批注的扫描页）
+BLANK_RENDER_DPI = 36
+BLANK_MARGIN = 0.05
+BLANK_INK_DELTA = 32
+BLANK_INK_RATIO = 0.001
+BLANK_MAX_STD = 8.0
+BLANK_MARK_PIXELS = 8
+
+
+def _largest_mark(mask) -> int:
+    """墨迹像素中最大的8连通区域的像素数（只在墨迹像素很少时调用）"""
+    remaining = set(zip(*np.nonzero(mask)))
+    largest = 0
+    while remaining:
+        stack = [remaining.pop()]
+        size = 0
+        while stack:
+            y, x = stack.pop()
+            size += 1
+            for neighbor in ((y + dy, x + dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)):
+                if neighbor in remaining:
+                    remaining.remove(neighbor)
+                    stack.append(neighbor)
+        largest = max(largest, size)
+    return largest
+
+
+def is_blank_pixmap(pix, ink_delta: int = BLANK_INK_DELTA, ink_ratio: float = BLANK_INK_RATIO,
+                    max_std: float = BLANK_MAX_STD, mark_pixels: int = BLANK_MARK_PIXELS) -> bool:
+    """
+    根据低分辨率灰度渲染判断页面是否空白
+    
+    墨迹占比和灰度标准差均低于阈值，且没有达到 mark_pixels 的连通墨迹
+    区域时视为空白；孤立的扫描噪点不构成连通区域，页码等少量文字则会。
+    
+    Args:
+        pix: 灰度渲染结果
+        ink_delta: 比背景（中位灰度）暗多少算墨迹
+        ink_ratio: 墨迹像素占比上限
+        max_std: 灰度标准差上限
+        mark_pixels: 连通墨迹区域达到该像素数即视为有内容
+    """
+    gray = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    gray = gray.reshape(pix.height, pix.stride)[:, :pix.width]
+    dy = int(pix.height * BLANK_MARGIN)
+    dx = int(pix.width * BLANK_MARGIN)
+    gray = gray[dy:pix.height - dy, dx:pix.width - dx]
+    if not gray.size:
+        return True
+    ink = gray < np.median(gray) - ink_delta
+    if np.count_nonzero(ink) >= ink_ratio * gray.size or gray.std() >= max_std:
+        return False
+    return _largest_mark(ink) < mark_pixels
+
+
+def is_blank_page(page, ink_delta: int = BLANK_INK_DELTA, ink_ratio: float = BLANK_INK_RATIO,
+                  max_std: float = BLANK_MAX_STD, mark_pixels: int = BLANK_MARK_PIXELS) -> bool:
+    """
+    判断页面是否空白
+    
+    有文字的页面直接视为非空白，没有任何绘制内容和注释的页面直接视为空白，
+    其余页面（图片、图形）以低分辨率渲染后按墨迹判断（阈值见 is_blank_pixmap）。
+    """
+    if page.get_text().strip():
+        return False
+    if not page.get_bboxlog() and not page.first_annot:
+        return True
+    pix = page.get_pixmap(dpi=BLANK_RENDER_DPI, colorspace=fitz.csGRAY, alpha=False, annots=True)
+    return is_blank_pixmap(pix, ink_delta, ink_ratio, max_std, mark_pixels)
+
+
+def _blank_shard(input_path: str, pages: list, thresholds: tuple) -> list:
+    """检测一组页面是否空白（供进程池调用）"""
+    doc = fitz.open(input_path)
+    try:
+        return [is_blank_page(doc[i], *thresholds) for i in pages]
+    finally:
+        doc.close()
+
+
+def blank_pages(input_path: str, total_pages: int, ink_delta: int = BLANK_INK_DELTA,
+                ink_ratio: float = BLANK_INK_RATIO, max_std: float = BLANK_MAX_STD,
+                mark_pixels: int = BLANK_MARK_PIXELS, workers: int = None,
+                progress_callback=None, progress_range=(0, 50)) -> list:
+    """
+    并行判断所有页面是否空白（阈值见 is_blank_pixmap）
+    
+    Returns:
+        与页面顺序一致的布尔列表
+    """
+    pages = list(range(total_pages))
+    return map_shards(_blank_shard, input_path, pages, workers,
+                      progress_reporter(progress_callback, total_pages, progress_range),
+                      (ink_delta, ink_ratio, max_std, mark_pixels))
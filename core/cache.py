@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+处理结果缓存
+
+以 (输入文件内容的SHA-256和文件名, 函数名, 规范化后的参数) 为键，将 core 中各功能
+的输出保存在磁盘缓存中。相同输入和参数再次执行时直接硬链接/复制缓存结果，
+按最近使用时间淘汰超出容量上限的条目。
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+
+# 缓存容量上限（字节）
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# 缓存格式版本，格式变化时递增以使旧条目失效
+CACHE_VERSION = 2
+
+# 保存消息时替代输出路径的占位符
+_OUTPUT_TOKEN = "\0output\0"
+
+_HASH_CHUNK = 1024 * 1024
+
+# 只影响执行方式、不影响输出内容的参数，不参与缓存键
+_EXECUTION_OPTIONS = {"workers", "batch_size", "max_memory"}
+
+
+def default_cache_dir() -> str:
+    """返回默认缓存目录（macOS 为 ~/Library/Caches/PDFToolbox）"""
+    home = os.path.expanduser("~")
+    if sys.platform == "darwin":
+        return os.path.join(home, "Library", "Caches", "PDFToolbox")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(home, ".cache")
+    return os.path.join(base, "PDFToolbox")
+
+
+def _file_digest(path: str) -> str:
+    """计算文件内容的SHA-256"""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _normalize(value):
+    """规范化参数值：已存在的文件路径替换为内容摘要，容器递归处理"""
+    if isinstance(value, str) and value and os.path.isfile(value):
+        return {"file": _file_digest(value)}
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+
+def _input_digest(item):
+    """
+    输入项的摘要，支持 (路径, 附加参数...) 形式的输入
+    
+    文件名也参与摘要：输出目录中的文件按输入文件名命名，结果消息中也
+    可能包含输入文件名，内容相同但名称不同的输入不能共用缓存。
+    """
+    if isinstance(item, (tuple, list)):
+        path, extra = item[0], [_normalize(value) for value in item[1:]]
+    else:
+        path, extra = item, []
+    return [_file_digest(path), os.path.basename(path)] + extra
+
+
+def cache_key(func, inputs, options: dict) -> str:
+    """
+    计算缓存键
+    
+    Args:
+        func: core 中的处理函数
+        inputs: 输入文件路径或路径列表（列表项也可为 (路径, 页面范围) 等元组）
+        options: 除输入、输出和进度回调外的全部参数（含默认值），
+            _EXECUTION_OPTIONS 中的参数不参与计算
+    
+    Returns:
+        十六进制SHA-256字符串
+    """
+    items = [inputs] if isinstance(inputs, (str, tuple)) else list(inputs)
+    payload = {
+        "version": CACHE_VERSION,
+        "func": f"{func.__module__}.{func.__qualname__}",
+        "inputs": [_input_digest(item) for item in items],
+        "options": _normalize({
+            name: value for name, value in options.items()
+            if name not in _EXECUTION_OPTIONS
+        }),
+    }
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _entry_files(root: str) -> list:
+    """列出条目输出目录下的所有文件（相对路径）"""
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            files.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return sorted(files)
+
+
+def _link_or_copy(src: str, dst: str):
+    """优先硬链接，失败时复制"""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _move(src: str, dst: str):
+    """移动文件（同一文件系统内为重命名）"""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    shutil.move(src, dst)
+
+
+def _materialize(entry: str, meta: dict, output_path: str, place=_link_or_copy):
+    """将缓存条目的输出放到目标位置（place 为硬链接/复制或移动）"""
+    root = os.path.join(entry, "output")
+    if meta["is_dir"]:
+        for rel in meta["files"]:
+            dst = os.path.join(output_path, rel)
+            os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+            place(os.path.join(root, rel), dst)
+    else:
+        parent = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(parent, exist_ok=True)
+        place(os.path.join(root, meta["files"][0]), output_path)
+
+
+def _entry_valid(entry: str, meta: dict) -> bool:
+    """检查缓存文件是否被修改（硬链接的输出被原地改写时会同时改变缓存）"""
+    root = os.path.join(entry, "output")
+    for rel, (size, mtime) in zip(meta["files"], meta["stats"]):
+        try:
+            st = os.stat(os.path.join(root, rel))
+        except OSError:
+            return False
+        if st.st_size != size or st.st_mtime_ns != mtime:
+            return False
+    return True
+
+
+def _load_entry(entry: str):
+    """读取条目元数据，条目不存在或已损坏时返回 None"""
+    try:
+        with open(os.path.join(entry, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not _entry_valid(entry, meta):
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+    return meta
+
+
+def _entries(cache_dir: str) -> list:
+    """列出所有条目：[(最近使用时间, 字节数, 路径)]"""
+    root = os.path.join(cache_dir, "entries")
+    entries = []
+    if not os.path.isdir(root):
+        return entries
+    for name in os.listdir(root):
+        entry = os.path.join(root, name)
+        try:
+            with open(os.path.join(entry, "meta.json"), "r", encoding="utf-8") as f:
+                size = json.load(f)["size"]
+            used = os.path.getmtime(os.path.join(entry, "meta.json"))
+        except (OSError, ValueError, KeyError):
+            shutil.rmtree(entry, ignore_errors=True)
+            continue
+        entries.append((used, size, entry))
+    return entries
+
+
+def evict(cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES) -> int:
+    """
+    按最近使用时间淘汰条目，直到总大小不超过上限
+    
+    Returns:
+        删除的条目数
+    """
+    entries = sorted(_entries(cache_dir or default_cache_dir()))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, entry in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def clear_cache(cache_dir: str = None):
+    """清空缓存"""
+    shutil.rmtree(os.path.join(cache_dir or default_cache_dir(), "entries"),
+                  ignore_errors=True)
+
+
+def cached(func, cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+    """
+    为 core 中的处理函数添加结果缓存
+    
+    函数的第一个参数为输入文件（或文件列表），第二个参数为输出文件；第二个
+    参数名为 output_dir 时按输出目录处理（如 split_pdf、pdf_to_images）。
+    未命中时在缓存目录中执行函数，再将结果放到实际输出位置；结果超过
+    容量上限时直接移到输出位置，不写入缓存。
+    
+    Args:
+        func: 处理函数
+        cache_dir: 缓存目录，默认为 default_cache_dir()
+        max_bytes: 缓存容量上限（字节）
+    
+    Returns:
+        参数与 func 相同的包装函数
+    """
+    signature = inspect.signature(func)
+    names = list(signature.parameters)
+    input_name, output_name = names[0], names[1]
+    is_dir = output_name == "output_dir"
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        options = dict(bound.arguments)
+        progress_callback = options.pop("progress_callback", None)
+        inputs = options.pop(input_name)
+        output_path = options.pop(output_name)
+        if not output_path:
+            return func(*args, **kwargs)
+        
+        store = cache_dir or default_cache_dir()
+        try:
+            key = cache_key(func, inputs, options)
+            entry = os.path.join(store, "entries", key)
+            meta = _load_entry(entry)
+            if meta:
+                _materialize(entry, meta, output_path)
+                os.utime(os.path.join(entry, "meta.json"))
+                if progress_callback:
+                    progress_callback(100)
+                if meta["message"] is None:
+                    return None
+                return meta["message"].replace(_OUTPUT_TOKEN, output_path)
+            os.makedirs(os.path.join(store, "entries"), exist_ok=True)
+            staging = tempfile.mkdtemp(prefix="tmp-", dir=store)
+        except OSError:
+            # 缓存不可用时直接执行
+            return func(*args, **kwargs)
+        
+        try:
+            root = os.path.join(staging, "output")
+            if is_dir:
+                target = root
+            else:
+                os.makedirs(root)
+                target = os.path.join(root, os.path.basename(output_path) or "output")
+            bound.arguments[output_name] = target
+            result = func(*bound.args, **bound.kwargs)
+            
+            files = _entry_files(root)
+            stats = []
+            for rel in files:
+                st = os.stat(os.path.join(root, rel))
+                stats.append((st.st_size, st.st_mtime_ns))
+            message = result.replace(target, _OUTPUT_TOKEN) if isinstance(result, str) else None
+            meta = {
+                "is_dir": is_dir,
+                "files": files,
+                "stats": stats,
+                "size": sum(size for size, _ in stats),
+                "message": message,
+                "created": time.time(),
+            }
+            if not is_dir and not files:
+                return result
+            if message is None or meta["size"] > max_bytes:
+                # 不缓存的结果直接移出，避免复制后又立即淘汰
+                _materialize(staging, meta, output_path, _move)
+                return result if message is None else message.replace(_OUTPUT_TOKEN, output_path)
+            _materialize(staging, meta, output_path)
+            
+            with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            try:
+                os.replace(staging, entry)
+                staging = None
+            except OSError:
+                pass  # 其他进程已写入相同条目
+            evict(store, max_bytes)
+            return message.replace(_OUTPUT_TOKEN, output_path) if message else result
+        finally:
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+    
+    return wrapper
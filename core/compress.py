@@ -4,10 +4,978 @@
 PDF压缩功能
 """
 
+import functools
+import hashlib
+import itertools
+import math
+import os
+import re
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 import fitz  # PyMuPDF
+import numpy as np
 
 
-def compress_pdf(input_path: str, output_path: str, level: int = 1, progress_callback=None):
+# 高压缩级别的默认图片参数
+DEFAULT_IMAGE_DPI = 150
+DEFAULT_JPEG_QUALITY = 60
+
+# 目标大小模式的搜索范围（DPI从高到低依次尝试，质量二分查找）
+TARGET_DPI_STEPS = (300, 200, 150, 110, 72)
+TARGET_QUALITY_RANGE = (20, 85)
+
+# 图片编码进程池中每个进程最多排队的任务数
+ENCODE_WINDOW_PER_WORKER = 2
+
+# 颜色精简：抽样像素数、判定为灰度的通道差阈值、判定为彩色的成片彩色
+# 像素数下限（抽样后的绝对数量，与图片大小无关，红章等小面积彩色也能保留）、
+# 判定为黑白的中间调范围和占比上限、黑白图片降采样的最低DPI
+CLASSIFY_SAMPLE_PIXELS = 250000
+GRAY_TOLERANCE = 12
+COLOR_MIN_PIXELS = 16
+BILEVEL_MIDTONES = (48, 208)
+BILEVEL_MIDTONE_RATIO = 0.02
+BILEVEL_MIN_DPI = 300
+
+# 分析时估算用：Flate抽样字节数、默认质量下JPEG每像素字节数（彩色/灰度）
+ANALYZE_SAMPLE_BYTES = 65536
+ANALYZE_JPEG_BYTES_PER_PIXEL = {False: 0.15, True: 0.08}
+
+# 扫描页分层压缩（MRC）：背景/前景图层DPI、参与分层的扫描图片最低DPI、
+# 图片覆盖页面的最小比例
+MRC_BACKGROUND_DPI = 100
+MRC_FOREGROUND_DPI = 50
+MRC_MIN_DPI = 200
+MRC_MIN_COVERAGE = 0.9
+
+# 颜色数不超过该值的非JPEG图片视为线条图，使用Flate无损压缩
+LINE_ART_MAX_COLORS = 16
+
+# 可由 xref_stream 直接解码的滤镜
+_RAW_FILTERS = {"", "/FlateDecode", "/LZWDecode", "/RunLengthDecode",
+                "/ASCII85Decode", "/ASCIIHexDecode"}
+
+# 去重时不参与比较的字典键（编码相关）
+_ENCODING_KEYS = {"Length", "Filter", "DecodeParms"}
+
+# 间接引用 "对象号 代数 R"（代数不限于 0）
+_REF_PATTERN = re.compile(r"\b(\d+) (\d+) R\b")
+_ICC_PATTERN = re.compile(r"/ICCBased\s+(\d+) \d+ R\b")
+_ENTRY_PATTERN = re.compile(r"/([^\s/<>\[\]()]+)\s+(\d+) \d+ R\b")
+
+# 对象流和交叉引用流只是其他对象的存储容器，分析时不单独统计
+_CONTAINER_TYPES = {"/ObjStm", "/XRef"}
+
+# 内容流中使用资源的操作符：/名称 Do、/名称 字号 Tf
+_USED_NAME_PATTERNS = {
+    "XObject": re.compile(rb"/([^\s/<>\[\]()]+)\s+Do\b"),
+    "Font": re.compile(rb"/([^\s/<>\[\]()]+)\s+[-+\d.]+\s+Tf\b"),
+}
+
+
+def format_size(size: int) -> str:
+    """格式化字节数"""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _has_raw_filter(doc, xref: int) -> bool:
+    """流是否只使用通用（非图像编码）滤镜"""
+    filter_type, filter_value = doc.xref_get_key(xref, "Filter")
+    return filter_type == "null" or filter_value in _RAW_FILTERS
+
+
+def _stream_digest(doc, xref: int, decoded: bool) -> str:
+    """
+    计算流内容的哈希
+    
+    通用滤镜比较解码后的内容；图像编码（JPEG、JBIG2等）解码代价高，
+    直接比较原始码流（此时滤镜参数已包含在对象描述中）。
+    """
+    data = doc.xref_stream(xref) if decoded else doc.xref_stream_raw(xref)
+    return hashlib.sha256(data or b"").hexdigest()
+
+
+def _object_signature(doc, xref: int, mapping: dict, decoded: bool) -> tuple:
+    """
+    对象字典的规范化描述
+    
+    引用按已有映射替换为规范 xref；指向非流对象（如颜色空间数组）的
+    引用展开为其内容，使不同 xref 的相同定义可以比较。
+    """
+    def resolve(m):
+        target = mapping.get(int(m[1]), int(m[1]))
+        if 0 < target < doc.xref_length() and not doc.xref_is_stream(target):
+            return _REF_PATTERN.sub(
+                lambda r: f"{mapping.get(int(r[1]), int(r[1]))} 0 R",
+                doc.xref_object(target, compressed=True),
+            )
+        return f"{target} 0 R"
+    
+    signature = []
+    for key in sorted(doc.xref_get_keys(xref)):
+        if key == "Length" or (decoded and key in _ENCODING_KEYS):
+            continue
+        value = doc.xref_get_key(xref, key)[1]
+        signature.append((key, _REF_PATTERN.sub(resolve, value)))
+    return tuple(signature)
+
+
+def _redirect_references(doc, mapping: dict):
+    """将所有对重复对象的引用改为指向规范对象"""
+    def replace(m):
+        xref = int(m[1])
+        if xref not in mapping:
+            return m[0]
+        return f"{mapping[xref]} 0 R"
+    
+    for xref in range(1, doc.xref_length()):
+        if xref in mapping:
+            continue
+        source = doc.xref_object(xref)
+        if not any(int(m[1]) in mapping for m in _REF_PATTERN.finditer(source)):
+            continue
+        if not doc.xref_is_stream(xref):
+            doc.update_object(xref, _REF_PATTERN.sub(replace, source))
+            continue
+        # update_object 会丢弃流数据，流对象逐键更新
+        for key in doc.xref_get_keys(xref):
+            value_type, value = doc.xref_get_key(xref, key)
+            new_value = _REF_PATTERN.sub(replace, value)
+            if new_value != value:
+                doc.xref_set_key(xref, key, new_value)
+
+
+def deduplicate_resources(doc):
+    """
+    合并文档中内容相同的图片、字体和ICC配置流
+    
+    每个流只计算一次内容哈希，重复对象的所有引用改为指向同一个
+    规范对象，保存时由 garbage 回收重复对象。
+    
+    Args:
+        doc: 已打开的 fitz 文档
+    
+    Returns:
+        (合并的对象数, 节省的字节数)
+    """
+    font_files = set()
+    profiles = set()
+    masks = set()
+    images = []
+    for xref in range(1, doc.xref_length()):
+        for m in _ICC_PATTERN.finditer(doc.xref_object(xref, compressed=True)):
+            profiles.add(int(m[1]))
+        if doc.xref_get_key(xref, "Type")[1] == "/FontDescriptor":
+            for key in ("FontFile", "FontFile2", "FontFile3"):
+                value_type, value = doc.xref_get_key(xref, key)
+                if value_type == "xref":
+                    font_files.add(int(value.split()[0]))
+        elif doc.xref_get_key(xref, "Subtype")[1] == "/Image":
+            images.append(xref)
+            value_type, value = doc.xref_get_key(xref, "SMask")
+            if value_type == "xref":
+                masks.add(int(value.split()[0]))
+    
+    # 先处理被引用的对象（字体、ICC配置、软遮罩），使引用它们的图片可以比较
+    groups = (
+        sorted(font_files | profiles),
+        [x for x in images if x in masks],
+        [x for x in images if x not in masks],
+    )
+    
+    mapping = {}
+    saved = 0
+    for group in groups:
+        seen = {}
+        for xref in group:
+            if not doc.xref_is_stream(xref):
+                continue
+            decoded = _has_raw_filter(doc, xref)
+            key = (_stream_digest(doc, xref, decoded),
+                   _object_signature(doc, xref, mapping, decoded))
+            if key in seen:
+                mapping[xref] = seen[key]
+                saved += len(doc.xref_stream_raw(xref))
+            else:
+                seen[key] = xref
+    
+    if mapping:
+        _redirect_references(doc, mapping)
+    
+    return len(mapping), saved
+
+
+def _resource_entries(doc, xref: int, path: str):
+    """
+    读取资源子字典（XObject、Font 等）
+    
+    Returns:
+        (字典所在xref, 字典路径, {名称: 引用xref})，不存在时返回 None
+    """
+    value_type, value = doc.xref_get_key(xref, path)
+    if value_type == "xref":
+        xref, path = int(value.split()[0]), ""
+        value_type, value = "dict", doc.xref_object(xref, compressed=True)
+    if value_type != "dict":
+        return None
+    entries = {m[1]: int(m[2]) for m in _ENTRY_PATTERN.finditer(value)}
+    return xref, path, entries
+
+
+def _prune_resources(doc):
+    """
+    移除页面资源中内容流未引用的 XObject 和字体，以及页面缩略图
+    
+    多个页面共享同一资源字典时按所有页面的引用合并判断；页面引用了
+    无独立资源的表单时不清理该页资源。
+    
+    Returns:
+        (移除的资源数, 移除的缩略图数)
+    """
+    used = {}
+    entries = {}
+    keep = set()
+    thumbnails = 0
+    
+    for page in doc:
+        if doc.xref_get_key(page.xref, "Thumb")[0] != "null":
+            doc.xref_set_key(page.xref, "Thumb", "null")
+            thumbnails += 1
+        
+        value_type, value = doc.xref_get_key(page.xref, "Resources")
+        if value_type == "xref":
+            base_xref, base_path = int(value.split()[0]), ""
+        elif value_type == "dict":
+            base_xref, base_path = page.xref, "Resources"
+        else:
+            continue  # 继承的资源不处理
+        
+        contents = page.read_contents()
+        page_dicts = []
+        for category, pattern in _USED_NAME_PATTERNS.items():
+            path = f"{base_path}/{category}" if base_path else category
+            found = _resource_entries(doc, base_xref, path)
+            if not found:
+                continue
+            key = found[:2]
+            entries[key] = found[2]
+            names = {m[1].decode("latin-1") for m in pattern.finditer(contents)}
+            used.setdefault(key, set()).update(names)
+            page_dicts.append(key)
+            
+            if category == "XObject":
+                for name in names:
+                    xobject = found[2].get(name)
+                    if (xobject and doc.xref_get_key(xobject, "Subtype")[1] == "/Form"
+                            and doc.xref_get_key(xobject, "Resources")[0] == "null"):
+                        keep.update(page_dicts)
+        
+        if any(key in keep for key in page_dicts):
+            keep.update(page_dicts)
+    
+    removed = 0
+    for key, names in entries.items():
+        if key in keep:
+            continue
+        xref, path = key
+        for name in names:
+            if name not in used[key]:
+                doc.xref_set_key(xref, f"{path}/{name}" if path else name, "null")
+                removed += 1
+    
+    return removed, thumbnails
+
+
+def _font_program_bytes(doc) -> int:
+    """嵌入字体程序的总字节数"""
+    total = 0
+    for xref in range(1, doc.xref_length()):
+        if doc.xref_get_key(xref, "Type")[1] != "/FontDescriptor":
+            continue
+        for key in ("FontFile", "FontFile2", "FontFile3"):
+            value_type, value = doc.xref_get_key(xref, key)
+            if value_type == "xref":
+                total += len(doc.xref_stream_raw(int(value.split()[0])) or b"")
+    return total
+
+
+def _subset_fonts(doc) -> int:
+    """
+    将嵌入字体子集化为实际使用的字形
+    
+    Returns:
+        节省的字体字节数
+    """
+    before = _font_program_bytes(doc)
+    try:
+        doc.subset_fonts()
+    except ImportError:
+        raise ImportError("请安装 fonttools: pip install fonttools")
+    return max(0, before - _font_program_bytes(doc))
+
+
+def _image_placements(doc) -> dict:
+    """
+    统计每个图片在所有页面上的最大显示尺寸
+    
+    Returns:
+        {xref: (宽度pt, 高度pt)}
+    """
+    placements = {}
+    for page in doc:
+        for info in page.get_image_info(xrefs=True):
+            xref = info.get("xref", 0)
+            if not xref:
+                continue
+            a, b, c, d = info["transform"][:4]
+            width, height = math.hypot(a, b), math.hypot(c, d)
+            old_w, old_h = placements.get(xref, (0, 0))
+            placements[xref] = (max(old_w, width), max(old_h, height))
+    return placements
+
+
+def _target_size(width: int, height: int, placement, dpi: int):
+    """根据显示尺寸计算目标像素尺寸，无需降采样时返回 None"""
+    if not dpi or not placement or not placement[0] or not placement[1]:
+        return None
+    need_w = placement[0] / 72 * dpi
+    need_h = placement[1] / 72 * dpi
+    scale = max(need_w / width, need_h / height)
+    if scale >= 1:
+        return None
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def _load_image_job(doc, xref: int, placement):
+    """
+    读取图片信息，生成重新编码任务
+    
+    任务只记录 xref 和图片尺寸等信息，不读取像素数据；编码时再从源文件
+    读取码流并解码（见 _decode_image）。带遮罩、解码数组或1位的图片
+    不处理，返回 None。
+    """
+    if doc.xref_get_key(xref, "ImageMask")[1] == "true":
+        return None
+    if doc.xref_get_key(xref, "Mask")[0] != "null":
+        return None
+    if doc.xref_get_key(xref, "Decode")[0] != "null":
+        return None
+    
+    filter_type, filter_value = doc.xref_get_key(xref, "Filter")
+    if filter_type == "array":
+        return None
+    filter_name = "" if filter_type == "null" else filter_value
+    
+    if filter_name == "/DCTDecode":
+        kind = "jpeg"
+    elif filter_name in _RAW_FILTERS:
+        if doc.xref_get_key(xref, "BitsPerComponent")[1] == "1":
+            return None
+        kind = "samples"
+    else:
+        # JBIG2、CCITT、JPX 等已是高效编码
+        return None
+    
+    width = _int_key(doc, xref, "Width")
+    height = _int_key(doc, xref, "Height")
+    if not width or not height:
+        return None
+    
+    return {
+        "path": doc.name,
+        "xref": xref,
+        "kind": kind,
+        "placement": placement,
+        "raw_size": len(doc.xref_stream_raw(xref)),
+        "width": width,
+        "height": height,
+    }
+
+
+def _int_key(doc, xref: int, key: str) -> int:
+    """读取对象字典中的整数值（支持间接引用），缺失或无效时返回 0"""
+    value_type, value = doc.xref_get_key(xref, key)
+    if value_type == "xref":
+        value = doc.xref_object(int(value.split()[0])).strip()
+    elif value_type != "int":
+        return 0
+    try:
+        return int(float(value))
+    except ValueError:
+        return 0
+
+
+@functools.lru_cache(maxsize=1)
+def _source_doc(path: str):
+    """打开编码任务的源文件（每个进程缓存一份）"""
+    return fitz.open(path)
+
+
+def _decode_image(job: dict):
+    """
+    从源文件读取并解码任务对应的图片
+    
+    读取的是未经修改的原文件，多次以不同参数编码同一图片时都从原始
+    图片出发。
+    
+    Returns:
+        (像素数据, 是否为线条图)，无法处理的图片返回 (None, False)
+    """
+    doc = _source_doc(job["path"])
+    if job["kind"] == "jpeg":
+        return fitz.Pixmap(doc.xref_stream_raw(job["xref"])), False
+    
+    pix = fitz.Pixmap(doc, job["xref"])
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n not in (1, 3, 4):
+        return None, False
+    return pix, _is_line_art(pix)
+
+
+def _sample_pixels(pix):
+    """将像素数据转为 (高, 宽, 通道) 数组并均匀抽样约 CLASSIFY_SAMPLE_PIXELS 个像素"""
+    pixels = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    pixels = pixels.reshape(pix.height, pix.stride)[:, :pix.width * pix.n]
+    pixels = pixels.reshape(pix.height, pix.width, pix.n)
+    step = max(1, int(math.sqrt(pix.width * pix.height / CLASSIFY_SAMPLE_PIXELS)))
+    return pixels[::step, ::step]
+
+
+def _is_line_art(pix) -> bool:
+    """抽样像素，颜色数不超过 LINE_ART_MAX_COLORS 时视为线条图"""
+    sample = _sample_pixels(pix).reshape(-1, pix.n)
+    return len(np.unique(sample, axis=0)) <= LINE_ART_MAX_COLORS
+
+
+def _classify_colors(pix) -> str:
+    """
+    抽样判断图片的实际颜色类型
+    
+    通道间差值超过 GRAY_TOLERANCE 且相邻像素也为彩色（排除孤立的压缩
+    噪点）的像素达到 COLOR_MIN_PIXELS 个时视为彩色，否则视为灰度；灰度
+    中间调像素占比低于 BILEVEL_MIDTONE_RATIO 时视为黑白。
+    
+    Returns:
+        "bilevel"、"gray" 或 "color"
+    """
+    sample = _sample_pixels(pix).astype(np.int16)
+    if pix.n >= 3:
+        rgb = sample[..., :3]
+        colored = (rgb.max(axis=2) - rgb.min(axis=2)) > GRAY_TOLERANCE
+        # 上下左右至少有一个相邻像素也是彩色
+        neighbor = np.zeros_like(colored)
+        neighbor[1:] |= colored[:-1]
+        neighbor[:-1] |= colored[1:]
+        neighbor[:, 1:] |= colored[:, :-1]
+        neighbor[:, :-1] |= colored[:, 1:]
+        if np.count_nonzero(colored & neighbor) >= COLOR_MIN_PIXELS:
+            return "color"
+        gray = rgb.mean(axis=2)
+    else:
+        gray = sample[..., 0]
+    
+    low, high = BILEVEL_MIDTONES
+    midtones = np.mean((gray > low) & (gray < high))
+    return "bilevel" if midtones < BILEVEL_MIDTONE_RATIO else "gray"
+
+
+def _pack_bilevel(pix) -> bytes:
+    """灰度像素按阈值二值化并打包为每像素1位（1=白）"""
+    gray = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    gray = gray.reshape(pix.height, pix.stride)[:, :pix.width]
+    return np.packbits(gray >= 128, axis=1).tobytes()
+
+
+def _encode_image(job: dict, dpi: int, quality: int, reduce_colors: bool = False):
+    """
+    对单个图片重新编码（降采样 + JPEG/Flate）
+    
+    Args:
+        job: _load_image_job 生成的任务
+        dpi: 降采样目标DPI，None 表示不降采样
+        quality: JPEG质量
+        reduce_colors: 是否将实际为灰度/黑白的图片转为灰度/1位
+    
+    Returns:
+        {"xref", "data", "filter", "width", "height", "n", "bpc"}，
+        无收益时返回 None
+    """
+    pix, line_art = _decode_image(job)
+    if pix is None:
+        return None
+    
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n == 4:  # CMYK转RGB
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    
+    kind = _classify_colors(pix) if reduce_colors else "color"
+    if kind != "color" and pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    
+    # 降低分辨率到目标DPI（黑白图片至少保留 BILEVEL_MIN_DPI 以保证文字清晰）
+    if kind == "bilevel" and dpi:
+        dpi = max(dpi, BILEVEL_MIN_DPI)
+    target = _target_size(pix.width, pix.height, job["placement"], dpi)
+    if target:
+        pix = fitz.Pixmap(pix, target[0], target[1], None)
+    
+    bpc = 8
+    if kind == "bilevel":
+        data = zlib.compress(_pack_bilevel(pix), 9)
+        filter_name = "/FlateDecode"
+        bpc = 1
+    elif line_art:
+        data = zlib.compress(pix.samples, 9)
+        filter_name = "/FlateDecode"
+    else:
+        data = pix.tobytes("jpeg", jpg_quality=quality)
+        filter_name = "/DCTDecode"
+    
+    if len(data) >= job["raw_size"]:
+        return None
+    
+    return {
+        "xref": job["xref"],
+        "data": data,
+        "filter": filter_name,
+        "width": pix.width,
+        "height": pix.height,
+        "n": pix.n,
+        "bpc": bpc,
+    }
+
+
+def _store_image(doc, result: dict):
+    """将重新编码后的图片写回原 xref"""
+    xref = result["xref"]
+    doc.update_stream(xref, result["data"], compress=False)
+    doc.xref_set_key(xref, "Filter", result["filter"])
+    doc.xref_set_key(xref, "Width", str(result["width"]))
+    doc.xref_set_key(xref, "Height", str(result["height"]))
+    doc.xref_set_key(xref, "BitsPerComponent", str(result["bpc"]))
+    doc.xref_set_key(xref, "ColorSpace",
+                     "/DeviceGray" if result["n"] == 1 else "/DeviceRGB")
+    doc.xref_set_key(xref, "DecodeParms", "null")
+
+
+def _load_image_jobs(doc, skip=()) -> list:
+    """收集文档中所有可重新编码的图片任务（每个 xref 只读取一次，跳过 skip 中的 xref）"""
+    placements = _image_placements(doc)
+    jobs = []
+    seen = set(skip)
+    for page in doc:
+        for img in page.get_images(full=True):
+            xref = img[0]
+            if xref in seen:
+                continue
+            seen.add(xref)
+            try:
+                job = _load_image_job(doc, xref, placements.get(xref))
+            except Exception:
+                job = None
+            if job:
+                jobs.append(job)
+    return jobs
+
+
+def _encode_image_safe(job: dict, dpi: int, quality: int, reduce_colors: bool):
+    """_encode_image 的容错包装，出错时返回 None（供进程池调用）"""
+    try:
+        return _encode_image(job, dpi, quality, reduce_colors)
+    except Exception:
+        return None
+
+
+class _ImageEncoder:
+    """
+    带缓存的图片编码器，相同 (xref, 目标尺寸, 质量) 只编码一次
+    
+    未命中缓存的图片分发到进程池并行编码，子进程按任务中的 xref 从源文件
+    读取并解码图片，只返回编码结果，写回文档由主进程完成。
+    """
+    
+    def __init__(self, jobs: list, workers: int = None, reduce_colors: bool = False):
+        self.jobs = jobs
+        self.cache = {}
+        self.workers = workers or os.cpu_count() or 1
+        self.reduce_colors = reduce_colors
+        self.pool = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """关闭进程池和主进程中打开的源文件"""
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+        _source_doc.cache_clear()
+    
+    def _run_parallel(self, pending: list, dpi: int, quality: int, on_done) -> bool:
+        """
+        在进程池中编码，进程池不可用时返回 False
+        
+        同时提交的任务不超过 ENCODE_WINDOW_PER_WORKER × 进程数，完成一个
+        再提交下一个，不会一次性排队全部任务。
+        """
+        try:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            queue = iter(pending)
+            futures = {}
+            
+            def submit(count):
+                for job, key in itertools.islice(queue, count):
+                    future = self.pool.submit(_encode_image_safe, job, dpi, quality,
+                                              self.reduce_colors)
+                    futures[future] = key
+            
+            submit(self.workers * ENCODE_WINDOW_PER_WORKER)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.cache[futures.pop(future)] = future.result()
+                    on_done()
+                submit(len(done))
+        except (BrokenProcessPool, OSError):
+            self.close()
+            return False
+        return True
+    
+    def encode(self, dpi: int, quality: int, progress_callback=None,
+               progress_range=(0, 80)) -> dict:
+        """
+        按给定参数编码所有图片
+        
+        Returns:
+            {xref: 编码结果或 None}
+        """
+        start, end = progress_range
+        keys = {}
+        pending = []
+        for job in self.jobs:
+            target = _target_size(job["width"], job["height"], job["placement"], dpi)
+            key = (job["xref"], target, quality)
+            keys[job["xref"]] = key
+            if key not in self.cache:
+                pending.append((job, key))
+        
+        done = [len(self.jobs) - len(pending)]
+        
+        def on_done():
+            done[0] += 1
+            if progress_callback:
+                progress_callback(start + int(done[0] / len(self.jobs) * (end - start)))
+        
+        parallel = self.workers > 1 and len(pending) > 1
+        if not parallel or not self._run_parallel(pending, dpi, quality, on_done):
+            for job, key in pending:
+                if key not in self.cache:
+                    self.cache[key] = _encode_image_safe(job, dpi, quality,
+                                                         self.reduce_colors)
+                    on_done()
+        
+        if progress_callback:
+            progress_callback(end)
+        return {xref: self.cache[key] for xref, key in keys.items()}
+    
+    def image_bytes(self, results: dict) -> int:
+        """编码结果对应的图片总字节数"""
+        total = 0
+        for job in self.jobs:
+            result = results.get(job["xref"])
+            total += len(result["data"]) if result else job["raw_size"]
+        return total
+
+
+def _recompress_images(doc, dpi: int, quality: int, workers: int = None,
+                       reduce_colors: bool = False, progress_callback=None,
+                       progress_range=(0, 80), skip=()) -> int:
+    """
+    按目标DPI降采样并重新编码文档中的所有图片（跳过 skip 中的 xref）
+    
+    Returns:
+        被替换的图片数量
+    """
+    jobs = _load_image_jobs(doc, skip)
+    with _ImageEncoder(jobs, workers, reduce_colors) as encoder:
+        results = encoder.encode(dpi, quality, progress_callback, progress_range)
+    
+    replaced = 0
+    for result in results.values():
+        if result:
+            _store_image(doc, result)
+            replaced += 1
+    return replaced
+
+
+def _fixed_size(doc, image_xrefs: set) -> int:
+    """估算除可重新编码图片外其余对象的字节数"""
+    total = 0
+    for xref in range(1, doc.xref_length()):
+        if xref in image_xrefs:
+            continue
+        total += len(doc.xref_object(xref, compressed=True))
+        if doc.xref_is_stream(xref):
+            total += len(doc.xref_stream_raw(xref) or b"")
+    return total
+
+
+def _fit_to_size(doc, target_bytes: int, output_path: str, save_options: dict,
+                 workers: int = None, reduce_colors: bool = False,
+                 progress_callback=None, skip=()):
+    """
+    搜索图片DPI和JPEG质量，使输出文件不超过目标大小
+    
+    按DPI从高到低找到第一个在最低质量下可满足目标的DPI，再对JPEG质量
+    二分查找。大小由固定部分加图片字节估算，编码结果全程缓存；保存后
+    若实际大小超出估算则修正后重新搜索。
+    
+    Returns:
+        (选定DPI, 选定质量, 被替换的图片数, 是否达到目标)
+    """
+    jobs = _load_image_jobs(doc, skip)
+    with _ImageEncoder(jobs, workers, reduce_colors) as encoder:
+        fixed = _fixed_size(doc, {job["xref"] for job in jobs})
+        min_q, max_q = TARGET_QUALITY_RANGE
+        steps = len(TARGET_DPI_STEPS) + 6
+        evaluated = [0]
+        
+        def fits(dpi, quality):
+            evaluated[0] += 1
+            if progress_callback:
+                progress_callback(10 + min(70, int(evaluated[0] / steps * 70)))
+            return fixed + encoder.image_bytes(encoder.encode(dpi, quality)) <= target_bytes
+        
+        def search():
+            for dpi in TARGET_DPI_STEPS:
+                if not fits(dpi, min_q):
+                    continue
+                if fits(dpi, max_q):
+                    return dpi, max_q, True
+                low, high = min_q, max_q
+                while high - low > 5:
+                    mid = (low + high) // 2
+                    if fits(dpi, mid):
+                        low = mid
+                    else:
+                        high = mid
+                return dpi, low, True
+            return TARGET_DPI_STEPS[-1], min_q, False
+        
+        replaced = set()
+        for attempt in range(3):
+            dpi, quality, ok = search()
+            for result in encoder.encode(dpi, quality).values():
+                if result:
+                    _store_image(doc, result)
+                    replaced.add(result["xref"])
+            
+            if progress_callback:
+                progress_callback(90)
+            doc.save(output_path, **save_options)
+            actual = os.path.getsize(output_path)
+            if actual <= target_bytes or not ok:
+                return dpi, quality, len(replaced), actual <= target_bytes
+            # 估算偏小，按实际差值修正固定部分后重新搜索
+            fixed += actual - (fixed + encoder.image_bytes(encoder.encode(dpi, quality)))
+        
+        return dpi, quality, len(replaced), False
+
+
+def _scanned_page_image(page, usage: dict):
+    """
+    判断是否为纯扫描页（无文字、仅一张未旋转且铺满页面的高分辨率图片）
+    
+    Returns:
+        该图片的 get_image_info 信息，不适合分层时返回 None
+    """
+    if page.rotation or page.get_text("text").strip():
+        return None
+    infos = page.get_image_info(xrefs=True)
+    if len(infos) != 1:
+        return None
+    info = infos[0]
+    xref = info.get("xref", 0)
+    if not xref or usage.get(xref, 0) != 1:
+        return None
+    doc = page.parent
+    if (doc.xref_get_key(xref, "SMask")[0] != "null"
+            or doc.xref_get_key(xref, "ImageMask")[1] == "true"):
+        return None
+    
+    a, b, c, d = info["transform"][:4]
+    if a <= 0 or d <= 0 or abs(b) > 1e-3 or abs(c) > 1e-3:
+        return None
+    bbox = fitz.Rect(info["bbox"])
+    if (bbox & page.rect).get_area() < page.rect.get_area() * MRC_MIN_COVERAGE:
+        return None
+    if info["width"] / (bbox.width / 72) < MRC_MIN_DPI:
+        return None
+    return info
+
+
+def _resize_layer(cv2, image, size):
+    """缩放图层，保持 (高, 宽, 通道) 形状"""
+    resized = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return resized.reshape(size[1], size[0], -1)
+
+
+def _encode_layer(image, quality: int) -> bytes:
+    """将 (高, 宽, 通道) 的 uint8 数组编码为JPEG"""
+    height, width, n = image.shape
+    colorspace = fitz.csGRAY if n == 1 else fitz.csRGB
+    pix = fitz.Pixmap(colorspace, width, height, np.ascontiguousarray(image).tobytes(), 0)
+    return pix.tobytes("jpeg", jpg_quality=quality)
+
+
+def _split_layers(cv2, image, dpi: float, quality: int):
+    """
+    将扫描图片拆分为背景、前景和文字掩码三层
+    
+    文字掩码由自适应阈值与Otsu全局阈值共同确定，保留原始分辨率；背景
+    按 MRC_BACKGROUND_DPI 缩小并修补文字区域；前景为文字像素的平均
+    颜色，按 MRC_FOREGROUND_DPI 保存。
+    
+    Args:
+        cv2: OpenCV 模块
+        image: (高, 宽, 通道) 的 uint8 数组（灰度或RGB）
+        dpi: 图片在页面上的实际DPI
+        quality: 背景和前景的JPEG质量
+    
+    Returns:
+        (背景JPEG, 前景JPEG, 掩码数据)，未检测到文字时返回 None
+    """
+    height, width = image.shape[:2]
+    gray = image[:, :, 0] if image.shape[2] == 1 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    
+    block = max(3, int(dpi / 8) | 1)
+    adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                     cv2.THRESH_BINARY_INV, block, 10)
+    _, dark = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    mask = cv2.bitwise_and(adaptive, dark)
+    if not mask.any():
+        return None
+    
+    def layer_size(layer_dpi):
+        scale = min(1.0, layer_dpi / dpi)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    
+    # 背景：缩小后修补被文字（含边缘）覆盖的像素
+    bg_size = layer_size(MRC_BACKGROUND_DPI)
+    cover = cv2.dilate(mask, np.ones((3, 3), np.uint8), iterations=2)
+    holes = (cv2.resize(cover, bg_size, interpolation=cv2.INTER_AREA) > 0).astype(np.uint8)
+    background = _resize_layer(cv2, image, bg_size)
+    if holes.any() and not holes.all():
+        background = cv2.inpaint(background, holes, 3, cv2.INPAINT_TELEA)
+        background = background.reshape(bg_size[1], bg_size[0], -1)
+    
+    # 前景：每个低分辨率像素取其中文字像素的平均颜色，空白处向外修补
+    fg_size = layer_size(MRC_FOREGROUND_DPI)
+    text = (mask > 0).astype(np.float32)
+    weights = _resize_layer(cv2, text, fg_size)
+    sums = _resize_layer(cv2, image.astype(np.float32) * text[:, :, None], fg_size)
+    foreground = np.clip(sums / np.maximum(weights, 1e-6), 0, 255).astype(np.uint8)
+    empty = (weights[:, :, 0] == 0).astype(np.uint8)
+    if empty.any():
+        foreground = cv2.inpaint(foreground, empty, 3, cv2.INPAINT_TELEA)
+        foreground = foreground.reshape(fg_size[1], fg_size[0], -1)
+    
+    mask_data = zlib.compress(np.packbits(mask > 0, axis=1).tobytes(), 9)
+    return _encode_layer(background, quality), _encode_layer(foreground, quality), mask_data
+
+
+def _mrc_compress(doc, quality: int, progress_callback=None, progress_range=(0, 100)):
+    """
+    对纯扫描页进行分层压缩（MRC）
+    
+    原图片替换为低分辨率背景，其上叠加带1位文字掩码（SMask）的低分辨率
+    前景图片，文字边缘保持原始分辨率。
+    
+    Returns:
+        (处理的页数, 生成的图片 xref 集合)
+    """
+    try:
+        import cv2
+    except ImportError:
+        raise ImportError("请安装 opencv-python-headless: pip install opencv-python-headless")
+    
+    usage = {}
+    for page in doc:
+        for img in page.get_images(full=True):
+            usage[img[0]] = usage.get(img[0], 0) + 1
+    
+    start, end = progress_range
+    total = len(doc)
+    pages = 0
+    created = set()
+    for i, page in enumerate(doc):
+        info = _scanned_page_image(page, usage)
+        layers = None
+        if info:
+            xref = info["xref"]
+            try:
+                pix = fitz.Pixmap(doc, xref)
+                if pix.alpha:
+                    pix = fitz.Pixmap(pix, 0)
+                if pix.n not in (1, 3):
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                image = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+                image = image.reshape(pix.height, pix.stride)[:, :pix.width * pix.n]
+                image = np.ascontiguousarray(image.reshape(pix.height, pix.width, pix.n))
+                dpi = pix.width / (fitz.Rect(info["bbox"]).width / 72)
+                layers = _split_layers(cv2, image, dpi, quality)
+            except Exception:
+                layers = None
+        
+        if layers:
+            background, foreground, mask_data = layers
+            raw_size = len(doc.xref_stream_raw(xref) or b"")
+            if len(background) + len(foreground) + len(mask_data) < raw_size:
+                bg_pix = fitz.Pixmap(background)
+                _store_image(doc, {
+                    "xref": xref, "data": background, "filter": "/DCTDecode",
+                    "width": bg_pix.width, "height": bg_pix.height,
+                    "n": bg_pix.n, "bpc": 8,
+                })
+                doc.xref_set_key(xref, "Decode", "null")
+                
+                fg_xref = page.insert_image(fitz.Rect(info["bbox"]), stream=foreground,
+                                            keep_proportion=False)
+                mask_xref = doc.get_new_xref()
+                doc.update_object(
+                    mask_xref,
+                    f"<</Type/XObject/Subtype/Image/Width {pix.width}/Height {pix.height}"
+                    f"/ColorSpace/DeviceGray/BitsPerComponent 1>>"
+                )
+                doc.update_stream(mask_xref, mask_data, new=True, compress=False)
+                doc.xref_set_key(mask_xref, "Filter", "/FlateDecode")
+                doc.xref_set_key(fg_xref, "SMask", f"{mask_xref} 0 R")
+                created.update((xref, fg_xref, mask_xref))
+                pages += 1
+        
+        if progress_callback:
+            progress_callback(start + int((i + 1) / total * (end - start)))
+    
+    return pages, created
+
+
+def compress_pdf(input_path: str, output_path: str, level: int = 1,
+                 image_dpi: int = None, jpeg_quality: int = None,
+                 dedupe: bool = True, target_bytes: int = None,
+                 workers: int = None, optimize_resources: bool = False,
+                 reduce_colors: bool = False, mrc: bool = False,
+                 progress_callback=None):
     """
     压缩PDF文件
     
@@ -15,10 +983,21 @@ def compress_pdf(input_path: str, output_path: str, level: int = 1, progress_cal
         input_path: 输入文件路径
         output_path: 输出文件路径
         level: 压缩级别 (0=低, 1=中, 2=高)
+        image_dpi: 图片降采样目标DPI（按图片在页面上的最大显示尺寸计算）
+        jpeg_quality: 图片重新编码的JPEG质量 (1-100)
+        dedupe: 是否合并内容相同的图片和字体
+        target_bytes: 目标文件大小（字节），指定后自动搜索图片DPI和质量，
+            忽略 image_dpi 和 jpeg_quality
+        workers: 图片编码的进程数，默认为CPU核心数，1 表示不使用进程池
+        optimize_resources: 是否子集化嵌入字体，并移除未引用的页面资源和
+            页面缩略图
+        reduce_colors: 是否将实际为灰度/黑白的彩色图片转为灰度/1位，
+            默认关闭
+        mrc: 是否对纯扫描页进行分层压缩（文字掩码 + 低分辨率背景/前景），
+            需要安装 opencv-python-headless
         progress_callback: 进度回调函数
     """
     doc = fitz.open(input_path)
-    total_pages = len(doc)
     
     # 根据压缩级别设置参数
     if level == 0:  # 低压缩
@@ -36,47 +1015,293 @@ def compress_pdf(input_path: str, output_path: str, level: int = 1, progress_cal
         deflate = True
         deflate_images = True
         deflate_fonts = True
+        image_dpi = image_dpi or DEFAULT_IMAGE_DPI
+        jpeg_quality = jpeg_quality or DEFAULT_JPEG_QUALITY
     
-    # 处理每一页（用于进度显示）
-    for i, page in enumerate(doc):
+    save_options = {
+        "garbage": garbage,
+        "deflate": deflate,
+        "deflate_images": deflate_images,
+        "deflate_fonts": deflate_fonts,
+        "clean": True,
+    }
+    
+    # 合并重复的图片和字体（先于重新编码，避免重复处理）
+    merged, saved = deduplicate_resources(doc) if dedupe else (0, 0)
+    if progress_callback:
+        progress_callback(10)
+    
+    message = f"压缩完成！已保存到 {output_path}"
+    if merged:
+        message += f"\n合并重复资源 {merged} 个，节省 {format_size(saved)}"
+    
+    # 精简资源：先清理未引用资源，再子集化字体
+    if optimize_resources:
+        removed, thumbnails = _prune_resources(doc)
+        font_saved = _subset_fonts(doc)
+        if removed or thumbnails:
+            message += f"\n移除未使用资源 {removed} 个、缩略图 {thumbnails} 个"
+        if font_saved:
+            message += f"\n字体子集化节省 {format_size(font_saved)}"
+    
+    # 扫描页分层压缩，生成的图层不再参与后续重新编码
+    layered = set()
+    if mrc:
+        pages, layered = _mrc_compress(
+            doc, jpeg_quality or DEFAULT_JPEG_QUALITY,
+            None if target_bytes else progress_callback, (10, 40)
+        )
+        if pages:
+            message += f"\n分层压缩扫描页 {pages} 页"
+    
+    # 目标大小模式：搜索参数并保存
+    if target_bytes:
+        dpi, quality, replaced, ok = _fit_to_size(
+            doc, target_bytes, output_path, save_options, workers,
+            bool(reduce_colors), progress_callback, layered
+        )
+        doc.close()
+        
         if progress_callback:
-            progress_callback(int((i + 1) / total_pages * 80))
-        
-        # 高压缩级别时降低图片质量
-        if level == 2:
-            for img in page.get_images():
-                xref = img[0]
-                try:
-                    # 尝试压缩图片
-                    pix = fitz.Pixmap(doc, xref)
-                    if pix.n >= 4:  # CMYK或带alpha通道
-                        pix = fitz.Pixmap(fitz.csRGB, pix)
-                    
-                    # 降低分辨率
-                    if pix.width > 1200 or pix.height > 1200:
-                        scale = 1200 / max(pix.width, pix.height)
-                        new_width = int(pix.width * scale)
-                        new_height = int(pix.height * scale)
-                        pix = fitz.Pixmap(pix, new_width, new_height)
-                except Exception:
-                    pass
+            progress_callback(100)
+        
+        size = format_size(os.path.getsize(output_path))
+        if ok:
+            message += f"\n文件大小 {size}（图片 {dpi} DPI，质量 {quality}）"
+        else:
+            message += f"\n未能压缩到 {format_size(target_bytes)} 以内，当前大小 {size}"
+        if replaced:
+            message += f"\n重新编码图片 {replaced} 张"
+        return message
+    
+    # 图片重新编码（高压缩级别或显式指定参数时）
+    replaced = 0
+    if image_dpi or jpeg_quality:
+        replaced = _recompress_images(
+            doc, image_dpi, jpeg_quality or 75, workers,
+            bool(reduce_colors), progress_callback,
+            (40 if mrc else 10, 80), layered
+        )
+    elif progress_callback:
+        progress_callback(80)
     
     if progress_callback:
         progress_callback(90)
     
     # 保存压缩后的PDF
-    doc.save(
-        output_path,
-        garbage=garbage,
-        deflate=deflate,
-        deflate_images=deflate_images,
-        deflate_fonts=deflate_fonts,
-        clean=True
+    doc.save(output_path, **save_options)
+    
+    doc.close()
+    
+    if progress_callback:
+        progress_callback(100)
+    
+    if replaced:
+        message += f"\n重新编码图片 {replaced} 张"
+    return message
+
+
+def _colorspace_name(doc, xref: int) -> str:
+    """图片颜色空间名称（ICCBased、Indexed 等取族名）"""
+    value_type, value = doc.xref_get_key(xref, "ColorSpace")
+    if value_type == "xref":
+        value = doc.xref_object(int(value.split()[0]), compressed=True)
+    match = re.search(r"/(\w+)", value)
+    return match[1] if match else "-"
+
+
+def _dpi_bucket(width: int, placement) -> str:
+    """按有效DPI分组"""
+    if not placement or not placement[0]:
+        return "未放置"
+    dpi = width / (placement[0] / 72)
+    if dpi <= 150:
+        return "<=150"
+    if dpi <= 300:
+        return "150-300"
+    return ">300"
+
+
+def _deflate_ratio(data: bytes) -> float:
+    """抽样估算 Flate 压缩率"""
+    sample = data[:ANALYZE_SAMPLE_BYTES]
+    if not sample:
+        return 1.0
+    return len(zlib.compress(sample, 6)) / len(sample)
+
+
+def analyze_pdf(input_path: str, progress_callback=None) -> dict:
+    """
+    分析PDF的空间占用（只读，不重写文件）
+    
+    遍历 xref 表，按类别统计字节数，并估算各压缩级别可节省的空间，
+    用于在压缩前判断文件是否值得处理。
+    
+    Args:
+        input_path: 输入文件路径
+        progress_callback: 进度回调函数
+    
+    Returns:
+        {
+            "file_size": 文件字节数,
+            "categories": {类别: 字节数},
+            "images": {(滤镜, 颜色空间, DPI分组): {"count", "bytes"}},
+            "fonts": {"embedded": 字节数, "subset": 字节数,
+                      "embedded_count": 个数, "subset_count": 个数},
+            "estimates": {级别: {"saved": 节省字节数, "size": 估算大小}},
+        }
+        类别包括 images、fonts、content、metadata、thumbnails、
+        embedded_files、unused、other。
+    """
+    doc = fitz.open(input_path)
+    file_size = os.path.getsize(input_path)
+    xref_count = doc.xref_length()
+    placements = _image_placements(doc)
+    
+    # 第一遍：记录对象大小、引用关系和特殊对象
+    sizes = {}
+    references = {}
+    content_xrefs = set()
+    thumbnails = set()
+    font_files = {}
+    containers = set()
+    for xref in range(1, xref_count):
+        object_type = doc.xref_get_key(xref, "Type")[1]
+        if object_type in _CONTAINER_TYPES:
+            # 其中对象的大小已逐个计入，且不会被其他对象引用
+            containers.add(xref)
+            continue
+        
+        source = doc.xref_object(xref, compressed=True)
+        references[xref] = [int(m[1]) for m in _REF_PATTERN.finditer(source)]
+        sizes[xref] = len(source)
+        if doc.xref_is_stream(xref):
+            sizes[xref] += len(doc.xref_stream_raw(xref) or b"")
+        
+        if object_type == "/Page":
+            value_type, value = doc.xref_get_key(xref, "Thumb")
+            if value_type == "xref":
+                thumbnails.add(int(value.split()[0]))
+        elif object_type == "/FontDescriptor":
+            subset = bool(re.match(r"/[A-Z]{6}\+", doc.xref_get_key(xref, "FontName")[1]))
+            for key in ("FontFile", "FontFile2", "FontFile3"):
+                value_type, value = doc.xref_get_key(xref, key)
+                if value_type == "xref":
+                    font_files[int(value.split()[0])] = subset
+        
+        if progress_callback:
+            progress_callback(int(xref / xref_count * 50))
+    
+    for page in doc:
+        content_xrefs.update(page.get_contents())
+    
+    # 从 trailer 出发标记可达对象
+    reachable = set()
+    stack = [int(m[1]) for m in _REF_PATTERN.finditer(doc.pdf_trailer())]
+    while stack:
+        xref = stack.pop()
+        if xref in reachable or xref not in references:
+            continue
+        reachable.add(xref)
+        stack.extend(references[xref])
+    
+    # 第二遍：分类统计并估算节省空间
+    categories = dict.fromkeys(
+        ("images", "fonts", "content", "metadata", "thumbnails",
+         "embedded_files", "unused", "other"), 0
     )
+    images = {}
+    fonts = {"embedded": 0, "subset": 0, "embedded_count": 0, "subset_count": 0}
+    unused_bytes = 0
+    duplicate_bytes = 0
+    deflate_bytes = 0
+    image_bytes = 0
+    seen_streams = set()
+    
+    for xref in range(1, xref_count):
+        if xref in containers:
+            continue
+        size = sizes[xref]
+        if xref not in reachable:
+            categories["unused"] += size
+            unused_bytes += size
+            continue
+        
+        is_stream = doc.xref_is_stream(xref)
+        raw = doc.xref_stream_raw(xref) if is_stream else b""
+        subtype = doc.xref_get_key(xref, "Subtype")[1]
+        object_type = doc.xref_get_key(xref, "Type")[1]
+        
+        # 重复流（原始码流相同）由去重合并，不再计算其他节省
+        duplicate = False
+        stored = len(raw)
+        if raw:
+            key = (hashlib.sha256(raw).digest(), doc.xref_get_key(xref, "Filter")[1])
+            duplicate = key in seen_streams
+            seen_streams.add(key)
+            if duplicate:
+                duplicate_bytes += size
+            elif doc.xref_get_key(xref, "Filter")[0] == "null":
+                stored = min(len(raw), int(len(raw) * _deflate_ratio(raw)))
+                deflate_bytes += len(raw) - stored
+        
+        if subtype == "/Image":
+            categories["images"] += size
+            filter_value = doc.xref_get_key(xref, "Filter")[1]
+            width = _int_key(doc, xref, "Width")
+            height = _int_key(doc, xref, "Height")
+            group = (filter_value.lstrip("/") if filter_value != "null" else "-",
+                     _colorspace_name(doc, xref),
+                     _dpi_bucket(width, placements.get(xref)))
+            entry = images.setdefault(group, {"count": 0, "bytes": 0})
+            entry["count"] += 1
+            entry["bytes"] += size
+            
+            # 高压缩：按默认DPI和质量估算JPEG大小
+            recodable = filter_value in ("/DCTDecode", "/FlateDecode", "null")
+            if recodable and not duplicate and width and height:
+                target = _target_size(width, height, placements.get(xref),
+                                      DEFAULT_IMAGE_DPI) or (width, height)
+                gray = group[1] in ("DeviceGray", "CalGray")
+                estimate = target[0] * target[1] * ANALYZE_JPEG_BYTES_PER_PIXEL[gray]
+                image_bytes += max(0, stored - int(estimate))
+        elif xref in font_files:
+            categories["fonts"] += size
+            kind = "subset" if font_files[xref] else "embedded"
+            fonts[kind] += size
+            fonts[kind + "_count"] += 1
+        elif xref in content_xrefs or subtype == "/Form":
+            categories["content"] += size
+        elif object_type == "/Metadata":
+            categories["metadata"] += size
+        elif xref in thumbnails:
+            categories["thumbnails"] += size
+        elif object_type == "/EmbeddedFile":
+            categories["embedded_files"] += size
+        else:
+            categories["other"] += size
+        
+        if progress_callback:
+            progress_callback(50 + int(xref / xref_count * 50))
     
     doc.close()
     
+    # 各级别累计：0=回收未用对象，1=再压缩未压缩流，2=再重新编码图片
+    saved = {0: unused_bytes + duplicate_bytes}
+    saved[1] = saved[0] + deflate_bytes
+    saved[2] = saved[1] + image_bytes
+    estimates = {
+        level: {"saved": value, "size": max(0, file_size - value)}
+        for level, value in saved.items()
+    }
+    
     if progress_callback:
         progress_callback(100)
     
-    return f"压缩完成！已保存到 {output_path}"
+    return {
+        "file_size": file_size,
+        "categories": categories,
+        "images": images,
+        "fonts": fonts,
+        "estimates": estimates,
+    }
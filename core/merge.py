@@ -4,44 +4,322 @@
 PDF合并功能
 """
 
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import fitz  # PyMuPDF
 
+from core.compress import deduplicate_resources, format_size
+from core.split import PageSelection
 
-def merge_pdfs(input_paths, output_path: str, progress_callback=None):
+
+# 分批合并时每批的默认文件数（仅指定内存上限时使用）
+DEFAULT_BATCH_SIZE = 200
+
+# 后台读取输入文件的线程数，以及合并时最多提前读取的文件数和总字节数
+# （指定内存上限时，提前读取的总字节数不超过上限的 PREFETCH_MEMORY_SHARE）
+PREFETCH_WORKERS = 8
+PREFETCH_AHEAD = 16
+PREFETCH_MAX_BYTES = 256 * 1024 * 1024
+PREFETCH_MEMORY_SHARE = 0.25
+
+# 按内存上限分批时每批至少包含的文件数（避免内存统计的波动使文件各自成批）
+BATCH_MIN_FILES = 4
+
+# 追加临时文件时，累计追加该字节数后增量保存并重新打开输出文件以释放内存
+# （指定内存上限时不超过上限的 APPEND_MEMORY_SHARE）
+APPEND_FLUSH_BYTES = 64 * 1024 * 1024
+APPEND_MEMORY_SHARE = 0.25
+
+
+def _current_rss() -> int:
+    """当前进程的常驻内存（字节），无法获取时返回 0"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _read_file(path: str) -> bytes:
+    """读取文件内容（在后台线程中执行）"""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _normalize_input(item):
+    """将输入项规范为 (路径, 页面范围)，范围为空表示全部页面"""
+    if isinstance(item, (tuple, list)):
+        path, spec = item
+        return path, (spec or "").strip()
+    return item, ""
+
+
+def _inspect_input(item) -> dict:
+    """
+    打开并检查输入文件，解析其页面范围
+    
+    Args:
+        item: 文件路径，或 (文件路径, 页面范围) 对
+    
+    Returns:
+        {"path", "pages", "runs", "size", "encrypted", "repaired", "error"}，
+        error 为 None 表示可以合并；runs 为要复制的连续页面区间
+    """
+    path, spec = _normalize_input(item)
+    info = {"path": path, "pages": 0, "runs": [], "size": 0, "encrypted": False,
+            "repaired": False, "error": None}
+    try:
+        info["size"] = os.path.getsize(path)
+        doc = fitz.open(path)
+    except Exception as e:
+        info["error"] = f"无法打开（{e}）"
+        return info
+    try:
+        info["pages"] = doc.page_count
+        info["encrypted"] = bool(doc.needs_pass)
+        info["repaired"] = bool(doc.is_repaired)
+        if info["encrypted"]:
+            info["error"] = "文件已加密，请先解密"
+        elif not info["pages"]:
+            info["error"] = "文件没有页面"
+        else:
+            pages = PageSelection(spec, info["pages"])
+            info["runs"] = pages.runs()
+            if not pages:
+                info["error"] = f"页面范围无效: {spec}"
+    except ValueError as e:
+        info["error"] = str(e)
+    finally:
+        doc.close()
+    return info
+
+
+def _validate_inputs(input_paths: list) -> list:
+    """
+    依次检查所有输入文件，有问题的文件一次性全部报告
+    
+    PyMuPDF 不支持多线程调用（MuPDF 以单线程模式初始化），文件逐个在
+    当前线程中打开检查；后台线程只用于读取文件内容（见 _prefetch）。
+    
+    Returns:
+        _inspect_input 的结果列表（与输入顺序一致）
+    """
+    infos = [_inspect_input(item) for item in input_paths]
+    
+    errors = [f"{os.path.basename(info['path'])}: {info['error']}"
+              for info in infos if info["error"]]
+    if errors:
+        raise ValueError(f"以下 {len(errors)} 个文件无法合并：\n" + "\n".join(errors))
+    return infos
+
+
+def _prefetch(infos: list, max_bytes: int = PREFETCH_MAX_BYTES):
+    """
+    按顺序产出 (输入信息, 文件内容)，后台线程提前读取后续文件
+    
+    提前读取的文件数不超过 PREFETCH_AHEAD，已读取和正在读取的文件总大小
+    不超过 max_bytes（至少读取当前文件）。
+    """
+    with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as pool:
+        pending = deque()
+        pending_bytes = 0
+        remaining = deque(infos)
+        while remaining or pending:
+            while remaining and len(pending) < PREFETCH_AHEAD and (
+                    not pending or pending_bytes + remaining[0]["size"] <= max_bytes):
+                info = remaining.popleft()
+                pending.append((info, pool.submit(_read_file, info["path"])))
+                pending_bytes += info["size"]
+            info, future = pending.popleft()
+            data = future.result()
+            pending_bytes -= info["size"]
+            yield info, data
+            del data
+
+
+def _insert_file(output_doc, path: str, data: bytes = None, runs: list = None):
+    """
+    将文件（或已读取的文件内容）的页面追加到 output_doc
+    
+    Args:
+        runs: 要复制的连续页面区间 [(起始页, 结束页)]，None 表示全部页面
+    """
+    try:
+        doc = fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(path)
+        if runs is None:
+            output_doc.insert_pdf(doc)
+        for start, end in runs or ():
+            output_doc.insert_pdf(doc, from_page=start, to_page=end)
+        doc.close()
+    except Exception as e:
+        raise ValueError(f"无法打开文件 {path}: {str(e)}")
+
+
+def _save_merged(doc, path: str, dedupe: bool):
+    """
+    合并重复资源后保存并关闭文档，同时释放 MuPDF 缓存
+    
+    Returns:
+        (合并的资源数, 节省的字节数)
+    """
+    merged, saved = deduplicate_resources(doc) if dedupe else (0, 0)
+    doc.save(path, garbage=1 if merged else 0)
+    doc.close()
+    fitz.TOOLS.store_shrink(100)
+    return merged, saved
+
+
+def _append_parts(parts: list, output_path: str, flush_bytes: int = APPEND_FLUSH_BYTES,
+                  progress_callback=None, progress_range=(70, 95)):
+    """
+    依次将临时文件追加到输出文件末尾
+    
+    输出文件保持打开，累计追加的临时文件超过 flush_bytes 时增量保存、
+    关闭并重新打开以释放内存，内存中最多约有 flush_bytes 的新增内容。
+    重新打开需要解析之前的全部修订，因此按字节数而不是每个文件保存一次，
+    临时文件较多时耗时不会随文件数成平方增长。
+    """
+    shutil.copyfile(parts[0], output_path)
+    if len(parts) == 1:
+        return
+    start, end = progress_range
+    doc = fitz.open(output_path)
+    pending = 0
+    for i, part in enumerate(parts[1:], 1):
+        _insert_file(doc, part)
+        pending += os.path.getsize(part)
+        if pending >= flush_bytes or i == len(parts) - 1:
+            doc.save(output_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+            doc.close()
+            fitz.TOOLS.store_shrink(100)
+            pending = 0
+            if i < len(parts) - 1:
+                doc = fitz.open(output_path)
+        if progress_callback:
+            progress_callback(start + int(i / len(parts) * (end - start)))
+
+
+def _batched_merge(infos: list, output_path: str, batch_size: int,
+                max_memory: int, dedupe: bool, progress_callback=None):
+    """
+    分批合并：每批写入临时文件，再依次追加到输出文件
+    
+    每批在文件数达到 batch_size，或合并开始后常驻内存的增长超过
+    max_memory 减去预读预算（且已有 BATCH_MIN_FILES 个文件）时写出，批内
+    合并重复资源；之后以增量保存的方式追加临时文件（见 _append_parts），
+    合并过程中内存里最多只有一批文件。不同批次之间的重复资源不会合并。
+    
+    Returns:
+        (合并的资源数, 节省的字节数)
+    """
+    total_files = len(infos)
+    merged = saved = 0
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    
+    with tempfile.TemporaryDirectory(prefix=".merge-", dir=out_dir) as tmp_dir:
+        parts = []
+        batch = fitz.open()
+        count = 0
+        prefetch_bytes = PREFETCH_MAX_BYTES
+        flush_bytes = APPEND_FLUSH_BYTES
+        if max_memory:
+            prefetch_bytes = min(prefetch_bytes, int(max_memory * PREFETCH_MEMORY_SHARE))
+            flush_bytes = min(flush_bytes, int(max_memory * APPEND_MEMORY_SHARE))
+        # 只比较合并开始后的内存增长，进程原有的常驻内存（如界面）不计入；
+        # 写出后未归还系统的内存由下一批复用，此时每批按最少文件数写出
+        batch_budget = (max_memory or 0) - prefetch_bytes
+        base_rss = _current_rss()
+        for i, (info, data) in enumerate(_prefetch(infos, prefetch_bytes)):
+            _insert_file(batch, info["path"], data, info["runs"])
+            count += 1
+            
+            last = i == total_files - 1
+            full = count >= batch_size or (
+                max_memory and count >= BATCH_MIN_FILES
+                and _current_rss() - base_rss > batch_budget
+            )
+            if full or last:
+                part = os.path.join(tmp_dir, f"part{len(parts)}.pdf")
+                m, s = _save_merged(batch, part, dedupe)
+                merged, saved = merged + m, saved + s
+                parts.append(part)
+                if not last:
+                    batch = fitz.open()
+                    count = 0
+                if progress_callback:
+                    progress_callback(int((i + 1) / total_files * 70))
+        
+        # 逐个追加临时文件
+        merged_path = os.path.join(tmp_dir, "merged.pdf")
+        _append_parts(parts, merged_path, flush_bytes, progress_callback)
+        shutil.move(merged_path, output_path)
+    
+    return merged, saved
+
+
+def merge_pdfs(input_paths, output_path: str, dedupe: bool = True,
+               batch_size: int = None, max_memory: int = None,
+               progress_callback=None):
     """
     合并多个PDF文件
     
     Args:
-        input_paths: 输入文件路径列表
+        input_paths: 输入文件列表，每项为文件路径或 (文件路径, 页面范围) 对，
+            页面范围如 "1-3, 5"、"last"（写法见 PageSelection），为空表示全部页面
         output_path: 输出文件路径
+        dedupe: 是否按内容合并各文件间相同的字体、图片和ICC配置，只保留一份
+        batch_size: 分批合并时每批的文件数，指定后（或指定 max_memory 时）
+            先将每批写入临时文件再依次追加到输出文件，适合大量文件
+        max_memory: 分批合并时常驻内存增长的上限（字节，不含合并前进程已占用
+            的内存），超过时提前写出当前批次
         progress_callback: 进度回调函数
     """
-    if isinstance(input_paths, str):
+    if isinstance(input_paths, (str, tuple)):
         input_paths = [input_paths]
     
     if len(input_paths) < 2:
         raise ValueError("至少需要2个PDF文件进行合并")
     
-    # 创建新的PDF文档
-    output_doc = fitz.open()
     total_files = len(input_paths)
     
-    for i, path in enumerate(input_paths):
-        try:
-            doc = fitz.open(path)
-            output_doc.insert_pdf(doc)
-            doc.close()
-        except Exception as e:
-            raise ValueError(f"无法打开文件 {path}: {str(e)}")
-        
-        if progress_callback:
-            progress_callback(int((i + 1) / total_files * 90))
+    # 合并前检查全部输入，避免合并到中途才发现坏文件
+    infos = _validate_inputs(input_paths)
+    repaired = sum(1 for info in infos if info["repaired"])
+    if progress_callback:
+        progress_callback(5)
     
-    # 保存
-    output_doc.save(output_path)
-    output_doc.close()
+    if batch_size or max_memory:
+        # 分批合并
+        batch_size = max(2, batch_size or DEFAULT_BATCH_SIZE)
+        merged, saved = _batched_merge(infos, output_path, batch_size,
+                                    max_memory, dedupe, progress_callback)
+    else:
+        # 创建新的PDF文档
+        output_doc = fitz.open()
+        
+        for i, (info, data) in enumerate(_prefetch(infos)):
+            _insert_file(output_doc, info["path"], data, info["runs"])
+            
+            if progress_callback:
+                progress_callback(int((i + 1) / total_files * 80))
+        
+        # 合并各文件间重复的资源后保存，保存时清理不再引用的副本
+        merged, saved = _save_merged(output_doc, output_path, dedupe)
     
     if progress_callback:
         progress_callback(100)
     
-    return f"合并完成！已将 {total_files} 个文件合并为 {output_path}"
+    message = f"合并完成！已将 {total_files} 个文件合并为 {output_path}"
+    if merged:
+        message += f"\n合并重复资源 {merged} 个，节省 {format_size(saved)}"
+    if repaired:
+        message += f"\n其中 {repaired} 个文件结构损坏，已自动修复"
+    return message
@@ -4,8 +4,40 @@
 PDF页面操作功能
 """
 
+import hashlib
+import math
+import os
 import fitz  # PyMuPDF
-from core.split import parse_page_range
+import numpy as np
+from core.blank import (BLANK_INK_DELTA, BLANK_INK_RATIO, BLANK_MARK_PIXELS, BLANK_MAX_STD,
+                        blank_pages, is_blank_pixmap)
+from core.parallel import map_shards, progress_reporter
+from core.split import PageSelection, format_page_spec, page_runs, select_pages
+from core.update import open_for_update, save_update
+
+
+# 自动裁剪：覆盖页面该比例以上的图片按扫描页处理（改为渲染检测），
+# 同样大小的填充路径视为页面背景
+CROP_SCAN_COVERAGE = 0.9
+
+# 自动裁剪渲染检测：渲染DPI、比背景暗多少算墨迹、墨迹像素占比超过
+# 该值的行/列才算内容（过滤扫描噪点），页边墨迹占比超过该值视为扫描黑边
+CROP_RENDER_DPI = 50
+CROP_INK_DELTA = 48
+CROP_NOISE_RATIO = 0.005
+CROP_BORDER_RATIO = 0.8
+
+# 重复页检测：指纹渲染DPI、感知哈希（64位）查找候选时允许的最大汉明
+# 距离、复核用缩略图边长及最低相关系数、每页最多复核的候选页数
+DUP_RENDER_DPI = 24
+DUP_MAX_DISTANCE = 10
+DUP_THUMB_SIZE = 48
+DUP_MIN_SIMILARITY = 0.9
+DUP_MAX_CANDIDATES = 64
+
+_DCT_SIZE = 32
+_DCT_MATRIX = np.cos(np.pi * np.outer(np.arange(_DCT_SIZE), 2 * np.arange(_DCT_SIZE) + 1)
+                     / (2 * _DCT_SIZE))
 
 
 def delete_pages(input_path: str, output_path: str, pages: str = "", 
@@ -26,7 +58,7 @@ def delete_pages(input_path: str, output_path: str, pages: str = "",
         raise ValueError("请指定要删除的页面")
     
     # 解析要删除的页面
-    pages_to_delete = parse_page_range(pages, total_pages)
+    pages_to_delete = PageSelection(pages, total_pages).unique()
     
     if not pages_to_delete:
         raise ValueError("无效的页面范围")
@@ -37,15 +69,14 @@ def delete_pages(input_path: str, output_path: str, pages: str = "",
     if progress_callback:
         progress_callback(30)
     
-    # 从后往前删除，避免索引问题
-    for page_idx in sorted(pages_to_delete, reverse=True):
-        doc.delete_page(page_idx)
+    # 一次性删除全部页面（逐页删除时每次都要重建目录和链接）
+    doc.delete_pages(pages_to_delete)
     
     if progress_callback:
         progress_callback(80)
     
-    # 保存
-    doc.save(output_path)
+    # 保存（清理被删除页面独占的对象）
+    doc.save(output_path, garbage=1)
     doc.close()
     
     if progress_callback:
@@ -54,6 +85,69 @@ def delete_pages(input_path: str, output_path: str, pages: str = "",
     return f"删除完成！已删除 {len(pages_to_delete)} 页，保存到 {output_path}"
 
 
+def remove_blank_pages(input_path: str, output_path: str,
+                       ink_delta: int = BLANK_INK_DELTA, ink_ratio: float = BLANK_INK_RATIO,
+                       max_std: float = BLANK_MAX_STD, mark_pixels: int = BLANK_MARK_PIXELS,
+                       report_only: bool = False, workers: int = None,
+                       progress_callback=None):
+    """
+    删除空白页（如双面扫描的空白背面）
+    
+    有文字的页面直接保留，没有任何内容的页面直接删除，其余页面以低分辨率
+    灰度渲染后按墨迹判断，可识别带扫描噪点的“几乎空白”页面，只有页码等
+    少量墨迹的页面会保留。渲染在进程池中并行进行，最后一次性删除全部空白页。
+    
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        ink_delta: 比背景暗多少算墨迹（0-255），越大越容易判为空白
+        ink_ratio: 墨迹像素占比上限，越大越容易判为空白
+        max_std: 灰度标准差上限，越大越容易判为空白
+        mark_pixels: 连通墨迹区域达到该像素数即视为有内容，越大越容易判为空白
+        report_only: 只报告空白页，不写出文件
+        workers: 进程数，默认为CPU核心数
+        progress_callback: 进度回调函数
+    """
+    doc = fitz.open(input_path)
+    total_pages = len(doc)
+    
+    blank = blank_pages(input_path, total_pages, ink_delta, ink_ratio, max_std, mark_pixels,
+                        workers=workers, progress_callback=progress_callback,
+                        progress_range=(0, 80))
+    pages_to_delete = [i for i, is_blank in enumerate(blank) if is_blank]
+    
+    if report_only:
+        doc.close()
+        if progress_callback:
+            progress_callback(100)
+        message = f"检查完成！共 {total_pages} 页，发现空白页 {len(pages_to_delete)} 页"
+        if pages_to_delete:
+            message += f"\n空白页：{format_page_spec(pages_to_delete)}"
+        return message
+    
+    if len(pages_to_delete) == total_pages:
+        doc.close()
+        raise ValueError("所有页面都是空白页")
+    
+    # 一次性删除全部空白页
+    if pages_to_delete:
+        doc.delete_pages(pages_to_delete)
+    
+    if progress_callback:
+        progress_callback(90)
+    
+    doc.save(output_path, garbage=1)
+    doc.close()
+    
+    if progress_callback:
+        progress_callback(100)
+    
+    message = f"删除完成！已删除 {len(pages_to_delete)} 个空白页，保存到 {output_path}"
+    if pages_to_delete:
+        message += f"\n删除的页面：{format_page_spec(pages_to_delete)}"
+    return message
+
+
 def extract_pages(input_path: str, output_path: str, pages: str = "", 
                   progress_callback=None):
     """
@@ -62,7 +156,7 @@ def extract_pages(input_path: str, output_path: str, pages: str = "",
     Args:
         input_path: 输入文件路径
         output_path: 输出文件路径
-        pages: 要提取的页面范围
+        pages: 要提取的页面范围，按书写顺序提取，如 "3,1-2"
         progress_callback: 进度回调函数
     """
     doc = fitz.open(input_path)
@@ -72,7 +166,7 @@ def extract_pages(input_path: str, output_path: str, pages: str = "",
         raise ValueError("请指定要提取的页面")
     
     # 解析要提取的页面
-    pages_to_extract = parse_page_range(pages, total_pages)
+    pages_to_extract = PageSelection(pages, total_pages)
     
     if not pages_to_extract:
         raise ValueError("无效的页面范围")
@@ -80,17 +174,16 @@ def extract_pages(input_path: str, output_path: str, pages: str = "",
     if progress_callback:
         progress_callback(20)
     
-    # 创建新文档并插入页面
-    new_doc = fitz.open()
+    # 一次性选出页面
+    new_doc = select_pages(doc, pages_to_extract)
     
-    for i, page_idx in enumerate(pages_to_extract):
-        new_doc.insert_pdf(doc, from_page=page_idx, to_page=page_idx)
-        if progress_callback:
-            progress_callback(20 + int((i + 1) / len(pages_to_extract) * 70))
+    if progress_callback:
+        progress_callback(80)
     
-    # 保存
-    new_doc.save(output_path)
-    new_doc.close()
+    # 保存（清理未选中页面的对象）
+    new_doc.save(output_path, garbage=1)
+    if new_doc is not doc:
+        new_doc.close()
     doc.close()
     
     if progress_callback:
@@ -107,7 +200,7 @@ def reorder_pages(input_path: str, output_path: str, order: str = "",
     Args:
         input_path: 输入文件路径
         output_path: 输出文件路径
-        order: 新的页面顺序，如 "3,1,2,5,4"
+        order: 新的页面顺序，如 "3,1,2,5,4" 或 "10-1"
         progress_callback: 进度回调函数
     """
     doc = fitz.open(input_path)
@@ -115,9 +208,8 @@ def reorder_pages(input_path: str, output_path: str, order: str = "",
     
     if not order or not order.strip():
         # 默认反转顺序
-        new_order = list(range(total_pages - 1, -1, -1))
-    else:
-        new_order = parse_page_range(order, total_pages)
+        order = "last-1"
+    new_order = PageSelection(order, total_pages)
     
     if not new_order:
         raise ValueError("无效的页面顺序")
@@ -125,19 +217,16 @@ def reorder_pages(input_path: str, output_path: str, order: str = "",
     if progress_callback:
         progress_callback(20)
     
-    # 创建新文档
-    new_doc = fitz.open()
+    # 一次性按新顺序排列页面
+    new_doc = select_pages(doc, new_order)
     
-    for i, page_idx in enumerate(new_order):
-        if 0 <= page_idx < total_pages:
-            new_doc.insert_pdf(doc, from_page=page_idx, to_page=page_idx)
-        
-        if progress_callback:
-            progress_callback(20 + int((i + 1) / len(new_order) * 70))
+    if progress_callback:
+        progress_callback(80)
     
     # 保存
-    new_doc.save(output_path)
-    new_doc.close()
+    new_doc.save(output_path, garbage=1)
+    if new_doc is not doc:
+        new_doc.close()
     doc.close()
     
     if progress_callback:
@@ -146,42 +235,419 @@ def reorder_pages(input_path: str, output_path: str, order: str = "",
     return f"重排完成！保存到 {output_path}"
 
 
+def _to_cropbox(page, rect):
+    """将显示坐标（page.rect 坐标系，已旋转）中的矩形转为 set_cropbox 使用的坐标"""
+    rect = fitz.Rect(rect) * page.derotation_matrix
+    origin = page.cropbox.tl
+    return fitz.Rect(rect.x0 + origin.x, rect.y0 + origin.y,
+                     rect.x1 + origin.x, rect.y1 + origin.y)
+
+
+def _edge_run(flags) -> int:
+    """开头连续为 True 的元素个数"""
+    return len(flags) if flags.all() else int(np.argmin(flags))
+
+
+def _rendered_content_rect(page):
+    """
+    低分辨率渲染页面，按行/列墨迹投影计算内容区域（用于扫描页）
+    
+    先去掉几乎全黑的页边（扫描黑边），再取墨迹占比超过噪点阈值的
+    首尾行列。
+    
+    Returns:
+        显示坐标中的内容矩形，页面空白时返回 None
+    """
+    pix = page.get_pixmap(dpi=CROP_RENDER_DPI, colorspace=fitz.csGRAY, alpha=False)
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    background = np.percentile(gray, 95)
+    ink = gray < background - CROP_INK_DELTA
+    
+    # 去掉扫描黑边
+    rows_dark = ink.mean(axis=1) > CROP_BORDER_RATIO
+    cols_dark = ink.mean(axis=0) > CROP_BORDER_RATIO
+    top = _edge_run(rows_dark)
+    bottom = pix.height - _edge_run(rows_dark[::-1])
+    left = _edge_run(cols_dark)
+    right = pix.width - _edge_run(cols_dark[::-1])
+    if top >= bottom or left >= right:
+        return None
+    ink = ink[top:bottom, left:right]
+    
+    rows = np.flatnonzero(ink.mean(axis=1) > CROP_NOISE_RATIO)
+    cols = np.flatnonzero(ink.mean(axis=0) > CROP_NOISE_RATIO)
+    if not len(rows) or not len(cols):
+        return None
+    scale = 72 / CROP_RENDER_DPI
+    return fitz.Rect((left + cols[0]) * scale, (top + rows[0]) * scale,
+                     (left + cols[-1] + 1) * scale, (top + rows[-1] + 1) * scale)
+
+
+def _content_rect(page):
+    """
+    计算页面内容区域
+    
+    矢量页面合并 get_bboxlog() 中文字、路径和图片的边界；含整页图片的
+    扫描页改为低分辨率渲染检测。
+    
+    Returns:
+        set_cropbox 坐标中的内容矩形，页面空白时返回 None
+    """
+    page_rect = page.cropbox
+    page_area = page_rect.get_area()
+    content = fitz.Rect()
+    for kind, bbox in page.get_bboxlog():
+        if not kind.startswith(("fill-", "stroke-")):
+            continue
+        bbox = fitz.Rect(bbox)
+        if bbox.is_empty:
+            continue
+        large = bbox.get_area() >= page_area * CROP_SCAN_COVERAGE
+        if large and "image" in kind:
+            rect = _rendered_content_rect(page)
+            return _to_cropbox(page, rect) if rect else None
+        if large and kind == "fill-path":
+            continue  # 页面背景
+        content |= bbox
+    
+    if content.is_empty:
+        return None
+    # get_bboxlog 的坐标相对于裁剪框左上角且未旋转
+    return content + (page_rect.x0, page_rect.y0, page_rect.x0, page_rect.y0)
+
+
+def _content_shard(input_path: str, pages: list) -> list:
+    """计算一组页面的内容区域（供进程池调用）"""
+    doc = fitz.open(input_path)
+    try:
+        results = []
+        for i in pages:
+            rect = _content_rect(doc[i])
+            results.append(tuple(rect) if rect else None)
+        return results
+    finally:
+        doc.close()
+
+
 def crop_pdf(input_path: str, output_path: str, margins: dict = None, 
-             progress_callback=None):
+             auto: bool = False, padding: float = 10, incremental: bool = False,
+             workers: int = None, progress_callback=None):
     """
     裁剪PDF页面边距
     
     Args:
         input_path: 输入文件路径
-        output_path: 输出文件路径
+        output_path: 输出文件路径（可与输入相同）
         margins: 边距字典 {"left": 20, "top": 20, "right": 20, "bottom": 20}
+        auto: 自动裁剪到每页的内容区域（忽略 margins），空白页不裁剪
+        padding: 自动裁剪时内容区域四周保留的留白（点）
+        incremental: 是否增量保存（只追加修改的页面对象，适合大文件）
+        workers: 自动裁剪时的进程数，默认为CPU核心数
         progress_callback: 进度回调函数
     """
-    doc = fitz.open(input_path)
+    if auto:
+        with fitz.open(input_path) as doc:
+            pages = list(range(len(doc)))
+        content = map_shards(_content_shard, input_path, pages, workers,
+                             progress_reporter(progress_callback, len(pages), (0, 80)))
+    
+    doc = open_for_update(input_path, output_path, incremental)
     total_pages = len(doc)
     
+    if auto:
+        cropped = 0
+        for page, rect in zip(doc, content):
+            if rect is None:
+                continue
+            # 加上留白，且不超出原裁剪框
+            new_rect = (fitz.Rect(rect) + (-padding, -padding, padding, padding)) & page.cropbox
+            if new_rect.is_empty or new_rect == page.cropbox:
+                continue
+            page.set_cropbox(new_rect)
+            cropped += 1
+        
+        if progress_callback:
+            progress_callback(90)
+        
+        save_update(doc, output_path, incremental)
+        
+        if progress_callback:
+            progress_callback(100)
+        
+        return f"裁剪完成！自动裁剪 {cropped} 页，保存到 {output_path}"
+    
     if margins is None:
         margins = {"left": 20, "top": 20, "right": 20, "bottom": 20}
     
     for i, page in enumerate(doc):
         rect = page.rect
-        # 创建新的裁剪区域
+        # 创建新的裁剪区域（边距按页面显示方向计算）
         new_rect = fitz.Rect(
             rect.x0 + margins.get("left", 0),
             rect.y0 + margins.get("top", 0),
             rect.x1 - margins.get("right", 0),
             rect.y1 - margins.get("bottom", 0)
         )
-        page.set_cropbox(new_rect)
+        page.set_cropbox(_to_cropbox(page, new_rect))
         
         if progress_callback:
             progress_callback(int((i + 1) / total_pages * 90))
     
     # 保存
-    doc.save(output_path)
-    doc.close()
+    save_update(doc, output_path, incremental)
     
     if progress_callback:
         progress_callback(100)
     
     return f"裁剪完成！保存到 {output_path}"
+
+
+def _block_mean(gray, rows: int, cols: int):
+    """按面积平均将灰度图缩小为 rows x cols"""
+    height, width = gray.shape
+    row_edges = np.linspace(0, height, rows + 1).astype(int)[:-1]
+    col_edges = np.linspace(0, width, cols + 1).astype(int)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(gray.astype(np.float64), row_edges, axis=0),
+                           col_edges, axis=1)
+    counts = np.outer(np.diff(np.append(row_edges, height)),
+                      np.diff(np.append(col_edges, width)))
+    return sums / counts
+
+
+def _perceptual_hash(gray) -> int:
+    """感知哈希（pHash）：32x32 缩略图的 8x8 低频 DCT 系数与中位数比较，得到64位整数"""
+    small = _block_mean(gray, _DCT_SIZE, _DCT_SIZE)
+    low = (_DCT_MATRIX @ small @ _DCT_MATRIX.T)[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def _thumbnail(gray):
+    """复核用缩略图：去均值并归一化，两页的点积即相关系数"""
+    rows = int(DUP_THUMB_SIZE * gray.shape[0] / gray.shape[1]) or 1
+    small = _block_mean(gray, rows, DUP_THUMB_SIZE)
+    small -= small.mean()
+    norm = np.linalg.norm(small)
+    return (small / norm if norm else small).astype(np.float32)
+
+
+def _similarity(thumb_a, thumb_b) -> float:
+    """两个缩略图的相关系数，尺寸不同（页面比例不同）时为 0"""
+    if thumb_a.shape != thumb_b.shape:
+        return 0.0
+    return float(np.vdot(thumb_a, thumb_b))
+
+
+def _fingerprint_shard(input_path: str, pages: list) -> list:
+    """
+    计算一组页面的指纹（供进程池调用）
+    
+    Returns:
+        与 pages 对应的列表，每项为 (感知哈希, 缩略图, 文字摘要或 None)，空白页为 None
+    """
+    doc = fitz.open(input_path)
+    try:
+        results = []
+        for i in pages:
+            page = doc[i]
+            # 小页面提高缩放，保证渲染结果不小于缩略图
+            zoom = max(DUP_RENDER_DPI / 72,
+                       max(_DCT_SIZE, DUP_THUMB_SIZE) / max(1, min(page.rect.width, page.rect.height)))
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY,
+                                  alpha=False)
+            if is_blank_pixmap(pix):
+                results.append(None)
+                continue
+            text = "".join(page.get_text().split())
+            digest = hashlib.sha1(text.encode("utf-8")).hexdigest() if text else None
+            gray = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+            gray = gray.reshape(pix.height, pix.stride)[:, :pix.width]
+            results.append((_perceptual_hash(gray), _thumbnail(gray), digest))
+        return results
+    finally:
+        doc.close()
+
+
+class _HammingIndex:
+    """
+    按汉明距离查找相近哈希的索引（多重索引哈希）
+    
+    将哈希分成 max_distance + 1 段，距离不超过 max_distance 的两个哈希
+    至少有一段完全相同，因此只需比较至少一段相同的候选项。
+    """
+    
+    def __init__(self, bits: int, max_distance: int):
+        self.max_distance = max_distance
+        bands = min(bits, max_distance + 1)
+        self.width = math.ceil(bits / bands)
+        self.bands = math.ceil(bits / self.width)
+        self.mask = (1 << self.width) - 1
+        # 每段的值 -> 哈希列表；相同的哈希只登记一次，对应的项按加入顺序保存
+        self.tables = [{} for _ in range(self.bands)]
+        self.items = {}
+    
+    def _keys(self, value: int):
+        for band in range(self.bands):
+            yield band, (value >> (band * self.width)) & self.mask
+    
+    def add(self, value: int, item):
+        if value not in self.items:
+            self.items[value] = []
+            for band, key in self._keys(value):
+                self.tables[band].setdefault(key, []).append(value)
+        self.items[value].append(item)
+    
+    def query(self, value: int, limit: int = None) -> list:
+        """返回距离不超过 max_distance 的 [(距离, 项)]，按距离和加入顺序排列，最多 limit 项"""
+        candidates = set()
+        for band, key in self._keys(value):
+            candidates.update(self.tables[band].get(key, ()))
+        distances = sorted(
+            (distance, other) for other, distance in
+            ((other, bin(value ^ other).count("1")) for other in candidates)
+            if distance <= self.max_distance
+        )
+        matches = []
+        for distance, other in distances:
+            for item in self.items[other]:
+                matches.append((distance, item))
+                if limit and len(matches) >= limit:
+                    return matches
+        return matches
+
+
+def find_duplicate_pages(input_paths, max_distance: int = DUP_MAX_DISTANCE,
+                         min_similarity: float = DUP_MIN_SIMILARITY,
+                         workers: int = None, progress_callback=None,
+                         progress_range=(0, 100)) -> list:
+    """
+    查找完全相同和近似重复的页面（可跨多个文件）
+    
+    每页以低分辨率灰度渲染的感知哈希、缩略图和文字摘要作为指纹。先在
+    哈希索引中查找汉明距离不超过 max_distance 的候选页，再要求缩略图
+    相关系数不低于 min_similarity、且（两页都有文字时）文字完全相同。每页
+    最多复核哈希最接近的 DUP_MAX_CANDIDATES 个候选页。
+    空白页不参与比较。指纹在进程池中并行计算。
+    
+    Args:
+        input_paths: 文件路径或路径列表
+        max_distance: 查找候选页时允许的最大汉明距离（共64位）
+        min_similarity: 缩略图最低相关系数，越接近 1 越严格
+        workers: 进程数，默认为CPU核心数
+        progress_callback: 进度回调函数
+        progress_range: 进度回调的取值范围
+    
+    Returns:
+        [(重复页, 首次出现的页, 相关系数)]，页面以 (文件序号, 页面索引) 表示
+    """
+    if isinstance(input_paths, str):
+        input_paths = [input_paths]
+    
+    page_counts = []
+    for path in input_paths:
+        with fitz.open(path) as doc:
+            page_counts.append(len(doc))
+    total = sum(page_counts)
+    start, end = progress_range
+    
+    index = _HammingIndex(64, max_distance)
+    duplicates = []
+    done = 0
+    for file_index, (path, count) in enumerate(zip(input_paths, page_counts)):
+        reporter = None
+        if progress_callback:
+            offset = done
+            reporter = lambda finished: progress_callback(
+                start + int((offset + finished) / max(1, total) * (end - start)))
+        fingerprints = map_shards(_fingerprint_shard, path, list(range(count)),
+                                  workers, reporter)
+        done += count
+        
+        for page_idx, fingerprint in enumerate(fingerprints):
+            if fingerprint is None:
+                continue
+            image_hash, thumb, text_digest = fingerprint
+            match = None
+            for _, original in index.query(image_hash, DUP_MAX_CANDIDATES):
+                if text_digest and original["text"] and text_digest != original["text"]:
+                    continue
+                similarity = _similarity(thumb, original["thumb"])
+                if similarity >= min_similarity:
+                    match = (original["page"], similarity)
+                    break
+            page = (file_index, page_idx)
+            if match:
+                duplicates.append((page, match[0], match[1]))
+            else:
+                index.add(image_hash, {"page": page, "thumb": thumb, "text": text_digest})
+    return duplicates
+
+
+def remove_duplicate_pages(input_paths, output_path: str,
+                           min_similarity: float = DUP_MIN_SIMILARITY,
+                           report_only: bool = False, workers: int = None,
+                           progress_callback=None):
+    """
+    删除重复页面（保留首次出现的页面）
+    
+    多个输入文件时，依次输出各文件中未重复的页面，合并为一个文件。
+    
+    Args:
+        input_paths: 文件路径或路径列表
+        output_path: 输出文件路径
+        min_similarity: 页面缩略图最低相关系数，越接近 1 越严格
+        report_only: 只报告重复页，不写出文件
+        workers: 进程数，默认为CPU核心数
+        progress_callback: 进度回调函数
+    """
+    if isinstance(input_paths, str):
+        input_paths = [input_paths]
+    
+    duplicates = find_duplicate_pages(input_paths, min_similarity=min_similarity,
+                                      workers=workers, progress_callback=progress_callback,
+                                      progress_range=(0, 80))
+    dropped = {page for page, _, _ in duplicates}
+    
+    def label(page):
+        file_index, page_idx = page
+        if len(input_paths) == 1:
+            return f"第 {page_idx + 1} 页"
+        return f"{os.path.basename(input_paths[file_index])} 第 {page_idx + 1} 页"
+    
+    details = ""
+    for page, original, similarity in duplicates[:20]:
+        details += f"\n{label(page)} 与 {label(original)} 重复（相似度 {similarity:.0%}）"
+    if len(duplicates) > 20:
+        details += f"\n……等 {len(duplicates)} 页"
+    
+    if report_only:
+        if progress_callback:
+            progress_callback(100)
+        return f"检查完成！发现重复页 {len(duplicates)} 页" + details
+    
+    output_doc = None
+    total_pages = 0
+    for file_index, path in enumerate(input_paths):
+        doc = fitz.open(path)
+        total_pages += len(doc)
+        keep = [i for i in range(len(doc)) if (file_index, i) not in dropped]
+        if len(input_paths) == 1:
+            output_doc = select_pages(doc, keep)
+            break
+        if output_doc is None:
+            output_doc = fitz.open()
+        for start, end in page_runs(keep):
+            output_doc.insert_pdf(doc, from_page=start, to_page=end)
+        doc.close()
+    
+    if progress_callback:
+        progress_callback(90)
+    
+    output_doc.save(output_path, garbage=1)
+    output_doc.close()
+    
+    if progress_callback:
+        progress_callback(100)
+    
+    return (f"去重完成！共 {total_pages} 页，删除重复页 {len(duplicates)} 页，"
+            f"保存到 {output_path}" + details)
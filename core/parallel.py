@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按页面并行处理（进程池分片执行）
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+# 任务数少于该值时不启动进程池
+POOL_MIN_ITEMS = 16
+
+# 每个进程平均分到的分片数（分片越多进度越细）
+POOL_SHARDS_PER_WORKER = 4
+
+
+def map_shards(func, input_path: str, items: list, workers: int = None,
+               on_result=None, *args) -> list:
+    """
+    将任务分片后由进程池并行执行，进程池不可用或任务较少时在当前进程执行
+    
+    每个分片调用一次 func(input_path, 分片, *args)，子进程中源文件只打开一次。
+    
+    Args:
+        func: 模块级函数，返回该分片的结果列表
+        input_path: 源文件路径
+        items: 任务列表
+        workers: 进程数，默认为CPU核心数，1 表示不使用进程池
+        on_result: 每完成一个分片时调用 on_result(已完成任务数)
+    
+    Returns:
+        按任务顺序排列的结果列表
+    """
+    workers = workers or os.cpu_count() or 1
+    shard_size = max(1, math.ceil(len(items) / (workers * POOL_SHARDS_PER_WORKER)))
+    shards = [items[i:i + shard_size] for i in range(0, len(items), shard_size)]
+    results = {}
+    finished = [0]
+    
+    def on_done(index, result):
+        results[index] = result
+        finished[0] += len(shards[index])
+        if on_result:
+            on_result(finished[0])
+    
+    if workers > 1 and len(items) >= POOL_MIN_ITEMS:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(func, input_path, shard, *args): index
+                    for index, shard in enumerate(shards)
+                }
+                for future in as_completed(futures):
+                    on_done(futures[future], future.result())
+        except (BrokenProcessPool, OSError):
+            pass
+    
+    for index, shard in enumerate(shards):
+        if index not in results:
+            on_done(index, func(input_path, shard, *args))
+    
+    return [result for index in range(len(shards)) for result in results[index]]
+
+
+def progress_reporter(progress_callback, total: int, progress_range):
+    """返回按已完成任务数换算进度的回调（无进度回调时返回 None）"""
+    if not progress_callback:
+        return None
+    start, end = progress_range
+    return lambda finished: progress_callback(start + int(finished / max(1, total) * (end - start)))
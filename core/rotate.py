@@ -4,30 +4,178 @@
 PDF旋转功能
 """
 
+import math
 import fitz  # PyMuPDF
-from core.split import parse_page_range
+from core.parallel import map_shards, progress_reporter
+from core.split import PageSelection
+from core.update import open_for_update, save_update
 
 
-def rotate_pdf(input_path: str, output_path: str, angle: int = 90, 
-               pages: str = "", progress_callback=None):
+# 自动识别方向：文字少于该字符数的页面按图片页处理
+AUTO_ROTATE_MIN_CHARS = 10
+
+# 图片页方向识别（Tesseract OSD）的渲染DPI和最低置信度
+AUTO_ROTATE_OSD_DPI = 100
+AUTO_ROTATE_MIN_CONFIDENCE = 2.0
+
+
+def _osd_available() -> bool:
+    """是否可以使用 Tesseract OSD 识别图片页方向"""
+    try:
+        import pytesseract
+        from PIL import Image  # noqa: F401
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+
+def _text_rotation(page):
+    """
+    根据文字行方向判断页面应设置的旋转角度
+    
+    行方向 dir 为未旋转页面坐标系中的单位向量（y 轴向下），按字符数
+    加权统计四个方向，返回使多数文字正向显示的 /Rotate 值。
+    
+    Returns:
+        0/90/180/270，文字不足时返回 None
+    """
+    weights = [0, 0, 0, 0]
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", ()):
+            chars = sum(len(span["text"].strip()) for span in line["spans"])
+            if not chars:
+                continue
+            dx, dy = line["dir"]
+            # 文字方向相对水平向右逆时针转过的角度，即需要顺时针旋转的角度
+            angle = math.degrees(math.atan2(-dy, dx))
+            weights[int(round(angle / 90)) % 4] += chars
+    if sum(weights) < AUTO_ROTATE_MIN_CHARS:
+        return None
+    return weights.index(max(weights)) * 90
+
+
+def _osd_rotation(page):
+    """
+    使用 Tesseract OSD 识别图片页方向
+    
+    Returns:
+        0/90/180/270，无法识别或置信度不足时返回 None
+    """
+    import pytesseract
+    from PIL import Image
+    
+    pix = page.get_pixmap(dpi=AUTO_ROTATE_OSD_DPI, colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    try:
+        osd = pytesseract.image_to_osd(img, output_type=pytesseract.Output.DICT)
+    except pytesseract.TesseractError:
+        return None
+    if osd.get("orientation_conf", 0) < AUTO_ROTATE_MIN_CONFIDENCE:
+        return None
+    # 渲染结果已包含页面当前的旋转，rotate 为还需顺时针旋转的角度
+    return (page.rotation + int(osd.get("rotate", 0))) % 360
+
+
+def _orientation_shard(input_path: str, pages: list, use_osd: bool) -> list:
+    """
+    识别一组页面应设置的旋转角度（供进程池调用）
+    
+    Returns:
+        与 pages 对应的列表，每项为 0/90/180/270，无法识别时为 None
+    """
+    doc = fitz.open(input_path)
+    try:
+        results = []
+        for i in pages:
+            page = doc[i]
+            rotation = _text_rotation(page)
+            if rotation is None and use_osd and page.get_images():
+                rotation = _osd_rotation(page)
+            results.append(rotation)
+        return results
+    finally:
+        doc.close()
+
+
+def detect_orientation(input_path: str, pages: list = None, workers: int = None,
+                       progress_callback=None, progress_range=(0, 100)) -> list:
+    """
+    识别页面方向
+    
+    有文字层的页面按文字行方向判断，纯图片页面使用 Tesseract OSD（未安装
+    时跳过）。识别在进程池中并行进行。
+    
+    Args:
+        input_path: 输入文件路径
+        pages: 要识别的页面索引列表，默认全部页面
+        workers: 进程数，默认为CPU核心数
+        progress_callback: 进度回调函数
+        progress_range: 进度回调的取值范围
+    
+    Returns:
+        与 pages 对应的列表，每项为页面应设置的 /Rotate 值，无法识别时为 None
+    """
+    if pages is None:
+        with fitz.open(input_path) as doc:
+            pages = list(range(len(doc)))
+    return map_shards(_orientation_shard, input_path, pages, workers,
+                      progress_reporter(progress_callback, len(pages), progress_range),
+                      _osd_available())
+
+
+def rotate_pdf(input_path: str, output_path: str, angle: int = 90,
+               pages: str = "", auto: bool = False, incremental: bool = False,
+               workers: int = None, progress_callback=None):
     """
     旋转PDF页面
     
     Args:
         input_path: 输入文件路径
-        output_path: 输出文件路径
+        output_path: 输出文件路径（可与输入相同）
         angle: 旋转角度 (90, 180, 270)
-        pages: 要旋转的页面范围，空则旋转所有页面
+        pages: 要旋转的页面范围（PageSelection 写法），空则旋转所有页面
+        auto: 自动识别每页方向，只旋转方向不正的页面（忽略 angle）
+        incremental: 是否增量保存（只追加修改的页面对象，适合大文件）
+        workers: 自动识别方向时的进程数，默认为CPU核心数
         progress_callback: 进度回调函数
     """
-    doc = fitz.open(input_path)
+    if auto:
+        with fitz.open(input_path) as doc:
+            page_list = PageSelection(pages, len(doc)).unique()
+        rotations = detect_orientation(input_path, page_list, workers,
+                                       progress_callback, (0, 80))
+    
+    doc = open_for_update(input_path, output_path, incremental)
     total_pages = len(doc)
     
-    # 解析要旋转的页面
-    if pages and pages.strip():
-        page_list = parse_page_range(pages, total_pages)
-    else:
-        page_list = list(range(total_pages))
+    if auto:
+        # 只旋转识别出方向且当前方向不正的页面
+        unknown = sum(1 for rotation in rotations if rotation is None)
+        changes = [
+            (page_idx, rotation)
+            for page_idx, rotation in zip(page_list, rotations)
+            if rotation is not None and rotation != doc[page_idx].rotation
+        ]
+        for page_idx, rotation in changes:
+            doc[page_idx].set_rotation(rotation)
+        
+        if progress_callback:
+            progress_callback(90)
+        
+        save_update(doc, output_path, incremental)
+        
+        if progress_callback:
+            progress_callback(100)
+        
+        message = (f"方向纠正完成！检查 {len(page_list)} 页，旋转 {len(changes)} 页，"
+                   f"保存到 {output_path}")
+        if unknown:
+            message += f"\n{unknown} 页无法识别方向，未作修改"
+        return message
+    
+    # 解析要旋转的页面（空则为全部页面，重复的页面只旋转一次）
+    page_list = PageSelection(pages, total_pages).unique()
     
     # 旋转页面
     for i, page_idx in enumerate(page_list):
@@ -38,8 +186,7 @@ def rotate_pdf(input_path: str, output_path: str, angle: int = 90,
             progress_callback(int((i + 1) / len(page_list) * 90))
     
     # 保存
-    doc.save(output_path)
-    doc.close()
+    save_update(doc, output_path, incremental)
     
     if progress_callback:
         progress_callback(100)
@@ -4,61 +4,529 @@
 PDF分割功能
 """
 
+import builtins
+import hashlib
+import itertools
 import os
+import re
+import zlib
 import fitz  # PyMuPDF
+from core.blank import (BLANK_INK_DELTA, BLANK_INK_RATIO, BLANK_MARK_PIXELS, BLANK_MAX_STD,
+                        blank_pages)
+from core.compress import format_size
+from core.parallel import map_shards, progress_reporter
+
+
+# 按大小分割：每个对象的额外开销（对象头和xref条目）、每个文件的固定开销、
+# 估算时使用的预算比例（估算误差约 ±5%）
+SIZE_OBJECT_OVERHEAD = 40
+SIZE_FILE_OVERHEAD = 2048
+SIZE_BUDGET_MARGIN = 0.95
+
+# 按大小分割时的保存参数（清理并合并共享资源）
+SIZE_SAVE_OPTIONS = {"garbage": 3, "deflate": True}
+
+_REF_PATTERN = re.compile(r"\b(\d+) \d+ R\b")
+# 估算页面资源时不跟随的反向引用（父节点、注释所属页面）
+_BACKREF_PATTERN = re.compile(r"/(?:Parent|P)\s+\d+ \d+ R\b")
+_SKIP_TYPES = {"/Page", "/Pages", "/Catalog"}
+
+# 文件名中不允许的字符
+_UNSAFE_NAME_PATTERN = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+# 页面范围中的单项：起始[-结束][:步长]，端点为页码、负数（倒数）或 last
+_SPEC_PATTERN = re.compile(r"^(-?\d+|last)(?:(-)(-?\d+|last)?)?(?::(\d+))?$")
+_SPEC_KEYWORDS = {
+    "odd": (0, 2), "奇数": (0, 2), "奇数页": (0, 2),
+    "even": (1, 2), "偶数": (1, 2), "偶数页": (1, 2),
+    "all": (0, 1), "全部": (0, 1),
+}
+
+
+class PageSelection:
+    """
+    页面选择，由若干 range 对象组成，保持书写顺序并保留重复页
+    
+    支持的写法（页码从1开始，逗号分隔，各项按顺序拼接）：
+        "5"          单页
+        "1-3"        连续页
+        "10-1"       倒序
+        "1-100:2"    带步长
+        "5-"         第5页到最后一页
+        "odd"/"even" 奇数页/偶数页（也可写 "奇数"/"偶数"）
+        "last"、"-1" 最后一页，"-3" 为倒数第3页，"-3-last" 为最后3页
+    空字符串表示全部页面。长度和成员判断与页数无关，只与范围项数有关。
+    """
+    
+    def __init__(self, spec: str, total_pages: int):
+        """
+        Args:
+            spec: 页面范围字符串
+            total_pages: 总页数
+        
+        Raises:
+            ValueError: 无法解析的范围项
+        """
+        self.total_pages = total_pages
+        self.ranges = []
+        if not spec or not spec.strip():
+            self.ranges.append(range(total_pages))
+        else:
+            for part in spec.replace(" ", "").replace("，", ",").split(","):
+                if part:
+                    self._add(part.lower())
+        self._length = sum(len(r) for r in self.ranges)
+    
+    def _index(self, token: str) -> int:
+        """将端点转为0起始索引（可能越界，由调用方处理）"""
+        if token == "last":
+            return self.total_pages - 1
+        number = int(token)
+        return self.total_pages + number if number < 0 else number - 1
+    
+    def _add(self, part: str):
+        """解析单个范围项并追加"""
+        total = self.total_pages
+        if part in _SPEC_KEYWORDS:
+            offset, step = _SPEC_KEYWORDS[part]
+            self.ranges.append(range(offset, total, step))
+            return
+        
+        m = _SPEC_PATTERN.match(part)
+        if not m or (m.group(1) == "0" or m.group(3) == "0"):
+            raise ValueError(f"无效的页面范围: {part}")
+        start = self._index(m.group(1))
+        if not m.group(2):
+            # 单页，越界时忽略
+            if 0 <= start < total:
+                self.ranges.append(range(start, start + 1))
+            return
+        
+        end = self._index(m.group(3)) if m.group(3) else total - 1
+        step = int(m.group(4) or 1)
+        if step < 1:
+            raise ValueError(f"无效的页面范围: {part}")
+        if start <= end:
+            # 截断到有效页面范围
+            if end < 0 or start >= total:
+                return
+            start = max(0, start)
+            end = min(total - 1, end)
+            if start > end:
+                return
+            self.ranges.append(range(start, end + 1, step))
+        else:
+            if start < 0 or end >= total:
+                return
+            start = min(total - 1, start)
+            end = max(0, end)
+            self.ranges.append(range(start, end - 1, -step))
+    
+    def __iter__(self):
+        for r in self.ranges:
+            yield from r
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def __bool__(self) -> bool:
+        return self._length > 0
+    
+    def __contains__(self, page) -> bool:
+        return any(page in r for r in self.ranges)
+    
+    def __repr__(self) -> str:
+        return f"PageSelection({format_page_spec(self)!r}, total_pages={self.total_pages})"
+    
+    def unique(self) -> list:
+        """去重并按页码排序后的页面列表"""
+        if len(self.ranges) == 1 and self.ranges[0].step == 1:
+            return list(self.ranges[0])
+        return sorted(set(self))
+    
+    def runs(self) -> list:
+        """按选择顺序合并为连续区间 [(起始页, 结束页)]，供 insert_pdf 批量复制"""
+        runs = []
+        
+        def extend(start, end):
+            if runs and start == runs[-1][1] + 1:
+                runs[-1] = (runs[-1][0], end)
+            else:
+                runs.append((start, end))
+        
+        for r in self.ranges:
+            if not len(r):
+                continue
+            if r.step == 1:
+                extend(r.start, r[-1])
+            else:
+                for page in r:
+                    extend(page, page)
+        return runs
+
+
+def select_pages(doc, selection):
+    """
+    按选择的顺序生成只含这些页面的文档（保留重复页）
+    
+    无重复页时直接在 doc 上调用 doc.select 一次完成，资源对象不会被重复
+    复制；有重复页时按连续区间批量 insert_pdf 到新文档。保存时应使用
+    garbage 清理未引用的对象。
+    
+    Args:
+        doc: 源文档
+        selection: PageSelection 或页面索引列表
+    
+    Returns:
+        结果文档（可能就是 doc）
+    """
+    pages = list(selection)
+    if len(set(pages)) == len(pages):
+        doc.select(pages)
+        return doc
+    runs = selection.runs() if isinstance(selection, PageSelection) else page_runs(pages)
+    new_doc = fitz.open()
+    for start, end in runs:
+        new_doc.insert_pdf(doc, from_page=start, to_page=end)
+    return new_doc
+
+
+def format_page_spec(pages) -> str:
+    """
+    将页面索引序列（0起始）格式化为紧凑的范围字符串，保持顺序
+    
+    连续递增或递减的页面合并为 "a-b"，如 [0, 1, 2, 6, 5, 4] -> "1-3,7-5"
+    """
+    parts = []
+    run_start = run_end = None
+    direction = 0
+    for page in pages:
+        if run_start is not None:
+            step = page - run_end
+            if step in (1, -1) and (direction == 0 or step == direction):
+                direction = step
+                run_end = page
+                continue
+            parts.append((run_start, run_end))
+        run_start = run_end = page
+        direction = 0
+    if run_start is not None:
+        parts.append((run_start, run_end))
+    return ",".join(
+        str(start + 1) if start == end else f"{start + 1}-{end + 1}"
+        for start, end in parts
+    )
 
 
 def parse_page_range(range_str: str, total_pages: int) -> list:
     """
-    解析页面范围字符串
+    解析页面范围字符串（兼容旧接口，新代码请使用 PageSelection）
     
     Args:
         range_str: 页面范围字符串，如 "1-3, 5, 7-10"
         total_pages: 总页数
     
     Returns:
-        页面索引列表 (0-indexed)
-    """
-    if not range_str or range_str.strip() == "":
-        return list(range(total_pages))
-    
-    pages = []
-    parts = range_str.replace(" ", "").split(",")
-    
-    for part in parts:
-        if "-" in part:
-            start_end = part.split("-")
-            if len(start_end) == 2:
-                try:
-                    start = int(start_end[0]) - 1  # 转为0索引
-                    end = int(start_end[1])  # 不减1，因为range是半开区间
-                    start = max(0, start)
-                    end = min(total_pages, end)
-                    pages.extend(range(start, end))
-                except ValueError:
-                    pass
+        去重排序后的页面索引列表 (0-indexed)
+    """
+    return PageSelection(range_str, total_pages).unique()
+
+
+def page_runs(pages: list) -> list:
+    """将页面索引列表合并为连续区间 [(起始页, 结束页)]，保持原有顺序"""
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+def _write_shard(input_path: str, shard: list, save_options: dict) -> list:
+    """
+    写出一组分割结果（供进程池调用，源文件只打开一次）
+    
+    Args:
+        input_path: 源文件路径
+        shard: [(输出路径, [(起始页, 结束页), ...]), ...]
+        save_options: 保存参数
+    
+    Returns:
+        写出的文件路径列表
+    """
+    doc = fitz.open(input_path)
+    try:
+        for output_path, runs in shard:
+            new_doc = fitz.open()
+            for start, end in runs:
+                new_doc.insert_pdf(doc, from_page=start, to_page=end)
+            new_doc.save(output_path, **save_options)
+            new_doc.close()
+    finally:
+        doc.close()
+    return [output_path for output_path, _ in shard]
+
+
+def _write_parts(input_path: str, parts: list, workers: int = None,
+                 save_options: dict = None, progress_callback=None,
+                 progress_range=(0, 100)):
+    """
+    并行写出分割结果
+    
+    Args:
+        input_path: 源文件路径
+        parts: [(输出路径, [(起始页, 结束页), ...]), ...]
+        workers: 进程数，默认为CPU核心数，1 表示不使用进程池
+        save_options: 保存参数
+        progress_callback: 进度回调函数
+        progress_range: 写出阶段对应的进度区间
+    """
+    map_shards(_write_shard, input_path, parts, workers,
+               progress_reporter(progress_callback, len(parts), progress_range),
+               save_options or {})
+
+
+def _object_cost(doc, xref: int):
+    """
+    估算对象写出后的字节数（字典 + 流长度，未压缩的流按 deflate 后计算）
+    
+    Returns:
+        (内容摘要, 字节数)，内容相同的对象保存时（garbage=3）会合并为一个
+    """
+    source = doc.xref_object(xref, compressed=True)
+    digest = hashlib.sha1(source.encode("utf-8", "replace"))
+    cost = len(source) + SIZE_OBJECT_OVERHEAD
+    if doc.xref_is_stream(xref):
+        raw = doc.xref_stream_raw(xref) or b""
+        digest.update(raw)
+        if doc.xref_get_key(xref, "Filter")[0] == "null":
+            cost += len(zlib.compress(raw, 1))
         else:
-            try:
-                page_num = int(part) - 1  # 转为0索引
-                if 0 <= page_num < total_pages:
-                    pages.append(page_num)
-            except ValueError:
-                pass
+            cost += len(raw)
+    return digest.digest(), cost
+
+
+def _page_objects(doc, page_xref: int, children: dict) -> set:
+    """
+    收集页面引用的全部对象（内容流、字体、图片、表单等），不包含其他页面
     
-    return sorted(set(pages))
+    Args:
+        children: 对象 -> 直接引用对象的缓存，跨页面复用
+    """
+    seen = {page_xref}
+    stack = [page_xref]
+    while stack:
+        xref = stack.pop()
+        refs = children.get(xref)
+        if refs is None:
+            source = _BACKREF_PATTERN.sub("", doc.xref_object(xref, compressed=True))
+            refs = []
+            for m in _REF_PATTERN.finditer(source):
+                ref = int(m.group(1))
+                if 0 < ref < doc.xref_length() and doc.xref_get_key(ref, "Type")[1] not in _SKIP_TYPES:
+                    refs.append(ref)
+            children[xref] = refs
+        for ref in refs:
+            if ref not in seen:
+                seen.add(ref)
+                stack.append(ref)
+    return seen
+
+
+def _size_ranges(doc, max_bytes: int, progress_callback=None, progress_range=(0, 30)) -> list:
+    """
+    按大小上限将页面划分为连续区间
+    
+    逐页累加新引用对象的估算字节数，同一部分中已出现的共享资源（字体、
+    图片等）不重复计算；超出上限时开始新的部分。单页超出上限时单独成为
+    一部分。
+    
+    Returns:
+        [(起始页, 结束页), ...]
+    """
+    start_progress, end_progress = progress_range
+    total_pages = len(doc)
+    children = {}
+    costs = {}
+    ranges = []
+    part_objects = set()
+    part_size = SIZE_FILE_OVERHEAD
+    part_start = 0
+    
+    for i, page in enumerate(doc):
+        objects = {}
+        for xref in _page_objects(doc, page.xref, children):
+            if xref not in costs:
+                costs[xref] = _object_cost(doc, xref)
+            digest, cost = costs[xref]
+            objects[digest] = cost
+        added = sum(cost for digest, cost in objects.items() if digest not in part_objects)
+        
+        if i > part_start and part_size + added > max_bytes:
+            ranges.append((part_start, i - 1))
+            part_start = i
+            part_objects = set()
+            part_size = SIZE_FILE_OVERHEAD
+            added = sum(objects.values())
+        
+        part_objects.update(objects)
+        part_size += added
+        
+        if progress_callback:
+            progress_callback(start_progress + int((i + 1) / total_pages * (end_progress - start_progress)))
+    
+    ranges.append((part_start, total_pages - 1))
+    return ranges
+
+
+def _safe_filename(title: str, max_length: int = 80) -> str:
+    """将书签标题等文字转为可用的文件名"""
+    name = _UNSAFE_NAME_PATTERN.sub("_", title).strip(" ._")
+    return name[:max_length].rstrip(" ._")
+
+
+def _outline_ranges(toc: list, total_pages: int, level: int) -> list:
+    """
+    根据书签计算分割区间
+    
+    每个层级不超过 level 的书签开始一个新部分，到下一个这样的书签之前
+    结束；第一个书签之前的页面单独成为一部分（标题为 None）。
+    
+    Args:
+        toc: doc.get_toc() 的结果 [[层级, 标题, 页码(从1开始)], ...]
+        total_pages: 总页数
+        level: 分割层级
+    
+    Returns:
+        [(标题, 起始页, 结束页), ...]
+    """
+    starts = {}
+    for lvl, title, page, *_ in toc:
+        # 同一页上有多个书签时使用第一个
+        if lvl <= level and 1 <= page <= total_pages and page - 1 not in starts:
+            starts[page - 1] = title
+    if not starts:
+        return []
+    
+    marks = sorted(starts.items())
+    ranges = []
+    if marks[0][0] > 0:
+        ranges.append((None, 0, marks[0][0] - 1))
+    for i, (start, title) in enumerate(marks):
+        end = marks[i + 1][0] - 1 if i + 1 < len(marks) else total_pages - 1
+        ranges.append((title, start, end))
+    return ranges
+
+
+def _blank_ranges(blank: list, drop_blank: bool) -> list:
+    """
+    以空白页为分隔计算分割区间，连续的空白页视为一个分隔
+    
+    Args:
+        blank: 每页是否空白
+        drop_blank: 是否丢弃空白页；不丢弃时空白页归入前一部分
+    
+    Returns:
+        [[(起始页, 结束页), ...], ...] 每部分的页面区间
+    """
+    parts = []
+    current = []
+    separator = False
+    for i, is_blank in enumerate(blank):
+        if is_blank:
+            separator = True
+            if not drop_blank:
+                current.append(i)
+            continue
+        if separator and any(not blank[page] for page in current):
+            parts.append(current)
+            current = []
+        separator = False
+        current.append(i)
+    if any(not blank[page] for page in current):
+        parts.append(current)
+    elif current and parts:
+        parts[-1].extend(current)
+    return [page_runs(pages) for pages in parts]
+
+
+def _match_shard(input_path: str, pages: list, pattern: str) -> list:
+    """
+    提取一组页面的文字并查找匹配（供进程池调用）
+    
+    Returns:
+        每页的匹配名称（有捕获组时取第一个捕获组），未匹配为 None
+    """
+    regex = re.compile(pattern)
+    doc = fitz.open(input_path)
+    try:
+        names = []
+        for i in pages:
+            m = regex.search(doc[i].get_text())
+            if m is None:
+                names.append(None)
+            else:
+                names.append((m.group(1) if m.re.groups and m.group(1) else m.group(0)).strip())
+        return names
+    finally:
+        doc.close()
+
+
+def _pattern_ranges(names: list) -> list:
+    """
+    每个匹配页开始一个新部分，第一个匹配页之前的页面单独成为一部分（标题为 None）
+    
+    Returns:
+        [(标题, 起始页, 结束页), ...]
+    """
+    starts = [i for i, name in enumerate(names) if name is not None]
+    if not starts:
+        return []
+    ranges = []
+    if starts[0] > 0:
+        ranges.append((None, 0, starts[0] - 1))
+    for i, start in enumerate(starts):
+        end = starts[i + 1] - 1 if i + 1 < len(starts) else len(names) - 1
+        ranges.append((names[start], start, end))
+    return ranges
+
+
+def _titled_parts(output_dir: str, base_name: str, ranges: list) -> list:
+    """按 [(标题, 起始页, 结束页)] 生成 NNN_标题.pdf 形式的输出列表"""
+    parts = []
+    for i, (title, start, end) in enumerate(ranges):
+        name = _safe_filename(title or "") or base_name
+        parts.append((os.path.join(output_dir, f"{i+1:03d}_{name}.pdf"), [(start, end)]))
+    return parts
 
 
 def split_pdf(input_path: str, output_dir: str, mode: int = 0, 
-              range: str = "", n_pages: int = 1, progress_callback=None):
+              range: str = "", n_pages: int = 1, max_bytes: int = None,
+              toc_level: int = 1, drop_blank: bool = True,
+              blank_ink_delta: int = BLANK_INK_DELTA, blank_ink_ratio: float = BLANK_INK_RATIO,
+              blank_max_std: float = BLANK_MAX_STD, blank_mark_pixels: int = BLANK_MARK_PIXELS,
+              pattern: str = "", workers: int = None, progress_callback=None):
     """
     分割PDF文件
     
     Args:
         input_path: 输入文件路径
         output_dir: 输出目录
-        mode: 分割模式 (0=每页一个文件, 1=按范围分割, 2=每N页一个文件)
-        range: 页面范围 (mode=1时使用)
+        mode: 分割模式 (0=每页一个文件, 1=按范围分割, 2=每N页一个文件,
+            3=按文件大小分割, 4=按书签分割, 5=按空白页分割, 6=按文字匹配分割)
+        range: 页面范围，按书写顺序输出，写法见 PageSelection (mode=1时使用)
         n_pages: 每个文件的页数 (mode=2时使用)
+        max_bytes: 单个文件的大小上限（字节）(mode=3时使用)，单页或拆分
+            后仍超出上限的文件会在返回信息中列出
+        toc_level: 按第几级书签分割，1 为顶级书签 (mode=4时使用)
+        drop_blank: 是否丢弃作为分隔的空白页 (mode=5时使用)
+        blank_ink_delta, blank_ink_ratio, blank_max_std, blank_mark_pixels:
+            空白页判断阈值，含义见 core.blank.is_blank_pixmap (mode=5时使用)
+        pattern: 正则表达式，页面文字匹配时开始新文件，文件以第一个捕获组
+            （无捕获组时为匹配文字）命名 (mode=6时使用)
+        workers: 提取、渲染和写出的进程数 (mode=0/2/3/4/5/6)，默认为CPU核心数，1 表示不使用进程池
         progress_callback: 进度回调函数
     """
     doc = fitz.open(input_path)
@@ -69,57 +537,130 @@ def split_pdf(input_path: str, output_dir: str, mode: int = 0,
         os.makedirs(output_dir)
     
     output_files = []
+    over_limit = []
     
     if mode == 0:  # 每页一个文件
-        for i in range(total_pages):
-            output_path = os.path.join(output_dir, f"{base_name}_page{i+1}.pdf")
-            new_doc = fitz.open()
-            new_doc.insert_pdf(doc, from_page=i, to_page=i)
-            new_doc.save(output_path)
-            new_doc.close()
-            output_files.append(output_path)
-            
-            if progress_callback:
-                progress_callback(int((i + 1) / total_pages * 100))
+        parts = [
+            (os.path.join(output_dir, f"{base_name}_page{i+1}.pdf"), [(i, i)])
+            for i in builtins.range(total_pages)
+        ]
+        _write_parts(input_path, parts, workers, None, progress_callback)
+        output_files = [path for path, _ in parts]
     
     elif mode == 1:  # 按范围分割
-        pages = parse_page_range(range, total_pages)
+        pages = PageSelection(range, total_pages)
         if not pages:
             raise ValueError("无效的页面范围")
         
         output_path = os.path.join(output_dir, f"{base_name}_extracted.pdf")
-        new_doc = fitz.open()
-        
-        for i, page_idx in enumerate(pages):
-            new_doc.insert_pdf(doc, from_page=page_idx, to_page=page_idx)
-            if progress_callback:
-                progress_callback(int((i + 1) / len(pages) * 100))
+        new_doc = select_pages(doc, pages)
+        if progress_callback:
+            progress_callback(50)
         
-        new_doc.save(output_path)
-        new_doc.close()
+        new_doc.save(output_path, garbage=1)
+        if new_doc is not doc:
+            new_doc.close()
         output_files.append(output_path)
     
     elif mode == 2:  # 每N页一个文件
         n_pages = max(1, n_pages)
-        file_count = 0
+        parts = [
+            (os.path.join(output_dir, f"{base_name}_part{i+1}.pdf"),
+             [(start, min(start + n_pages, total_pages) - 1)])
+            for i, start in enumerate(builtins.range(0, total_pages, n_pages))
+        ]
+        _write_parts(input_path, parts, workers, None, progress_callback)
+        output_files = [path for path, _ in parts]
+    
+    elif mode == 3:  # 按文件大小分割
+        if not max_bytes or max_bytes <= 0:
+            raise ValueError("请指定单个文件的大小上限")
+        ranges = _size_ranges(doc, int(max_bytes * SIZE_BUDGET_MARGIN), progress_callback)
         
-        for start in range(0, total_pages, n_pages):
-            end = min(start + n_pages - 1, total_pages - 1)
-            file_count += 1
-            output_path = os.path.join(output_dir, f"{base_name}_part{file_count}.pdf")
-            
-            new_doc = fitz.open()
-            new_doc.insert_pdf(doc, from_page=start, to_page=end)
-            new_doc.save(output_path)
-            new_doc.close()
-            output_files.append(output_path)
-            
-            if progress_callback:
-                progress_callback(int((start + n_pages) / total_pages * 100))
+        # 先写出为临时文件名，只有超出上限的部分拆分重写，最后按顺序改名
+        temp_names = (os.path.join(output_dir, f".{base_name}_size{i}.pdf")
+                      for i in itertools.count())
+        pieces = [(page_range, next(temp_names)) for page_range in ranges]
+        _write_parts(input_path, [(path, [page_range]) for page_range, path in pieces],
+                     workers, SIZE_SAVE_OPTIONS, progress_callback, (30, 100))
+        for attempt in builtins.range(3):
+            # 估算偏小导致超出上限的多页部分对半拆分后重写
+            new_pieces = []
+            rewrite = []
+            for (start, end), path in pieces:
+                if start < end and os.path.getsize(path) > max_bytes:
+                    os.remove(path)
+                    middle = (start + end) // 2
+                    halves = [((start, middle), next(temp_names)),
+                              ((middle + 1, end), next(temp_names))]
+                    new_pieces += halves
+                    rewrite += halves
+                else:
+                    new_pieces.append(((start, end), path))
+            if not rewrite:
+                break
+            pieces = new_pieces
+            _write_parts(input_path, [(path, [page_range]) for page_range, path in rewrite],
+                         workers, SIZE_SAVE_OPTIONS)
+        
+        for i, (_, path) in enumerate(pieces):
+            output_files.append(os.path.join(output_dir, f"{base_name}_part{i+1}.pdf"))
+            os.replace(path, output_files[-1])
+        
+        # 单页部分或拆分次数用尽后仍超出上限的文件，在结果中列出
+        over_limit = [
+            (path, os.path.getsize(path)) for path in output_files
+            if os.path.getsize(path) > max_bytes
+        ]
+    
+    elif mode == 4:  # 按书签分割
+        ranges = _outline_ranges(doc.get_toc(), total_pages, max(1, toc_level))
+        if not ranges:
+            raise ValueError("文档没有可用于分割的书签")
+        parts = _titled_parts(output_dir, base_name, ranges)
+        _write_parts(input_path, parts, workers, None, progress_callback)
+        output_files = [path for path, _ in parts]
+    
+    elif mode == 5:  # 按空白页分割
+        blank = blank_pages(input_path, total_pages, blank_ink_delta, blank_ink_ratio,
+                            blank_max_std, blank_mark_pixels, workers=workers,
+                            progress_callback=progress_callback)
+        ranges = _blank_ranges(blank, drop_blank)
+        if not ranges:
+            raise ValueError("文档中没有非空白页面")
+        parts = [
+            (os.path.join(output_dir, f"{base_name}_part{i+1}.pdf"), runs)
+            for i, runs in enumerate(ranges)
+        ]
+        _write_parts(input_path, parts, workers, None, progress_callback, (50, 100))
+        output_files = [path for path, _ in parts]
+    
+    elif mode == 6:  # 按文字匹配分割
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"无效的正则表达式: {e}")
+        if not pattern:
+            raise ValueError("请输入用于分割的文字规则")
+        
+        # 先并行提取全部页面的匹配位置，再统一写出
+        names = map_shards(_match_shard, input_path, list(builtins.range(total_pages)), workers,
+                           progress_reporter(progress_callback, total_pages, (0, 50)), pattern)
+        ranges = _pattern_ranges(names)
+        if not ranges:
+            raise ValueError("没有页面匹配该规则")
+        parts = _titled_parts(output_dir, base_name, ranges)
+        _write_parts(input_path, parts, workers, None, progress_callback, (50, 100))
+        output_files = [path for path, _ in parts]
     
     doc.close()
     
     if progress_callback:
         progress_callback(100)
     
-    return f"分割完成！生成了 {len(output_files)} 个文件到 {output_dir}"
+    message = f"分割完成！生成了 {len(output_files)} 个文件到 {output_dir}"
+    if over_limit:
+        message += f"\n以下 {len(over_limit)} 个文件仍超过大小上限 {format_size(max_bytes)}："
+        for path, size in over_limit:
+            message += f"\n{os.path.basename(path)}（{format_size(size)}）"
+    return message
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+修改已有PDF文件（增量保存、原地替换输出文件）
+"""
+
+import os
+import shutil
+import tempfile
+import fitz  # PyMuPDF
+
+
+def _same_file(path_a: str, path_b: str) -> bool:
+    """两个路径是否指向同一个文件"""
+    try:
+        return os.path.samefile(path_a, path_b)
+    except OSError:
+        return os.path.abspath(path_a) == os.path.abspath(path_b)
+
+
+def _replace_file(output_path: str, write):
+    """
+    先由 write(临时文件路径) 写入同目录下的临时文件，再替换 output_path
+    
+    替换后输出为新文件，不会写入与其他路径共享的硬链接（如缓存结果）。
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=".pdf",
+                                    dir=os.path.dirname(os.path.abspath(output_path)))
+    os.close(fd)
+    try:
+        # mkstemp 创建的文件只有所有者可读写，改为原文件（或新文件默认）的权限
+        try:
+            mode = os.stat(output_path).st_mode & 0o777
+        except OSError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        write(tmp_path)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_for_update(input_path: str, output_path: str, incremental: bool = False):
+    """
+    打开要修改的文档
+    
+    增量模式下，输出路径与输入不同时先将输入复制为新的输出文件再打开；
+    原地修改时如果文件有其他硬链接，先复制一份断开链接。之后由
+    save_update 把修改追加到文件末尾。
+    """
+    if not incremental:
+        return fitz.open(input_path)
+    if not _same_file(input_path, output_path):
+        _replace_file(output_path, lambda tmp_path: shutil.copyfile(input_path, tmp_path))
+    elif os.stat(output_path).st_nlink > 1:
+        _replace_file(output_path, lambda tmp_path: shutil.copy2(output_path, tmp_path))
+    return fitz.open(output_path)
+
+
+def save_update(doc, output_path: str, incremental: bool = False) -> bool:
+    """
+    保存并关闭 open_for_update 打开的文档
+    
+    增量保存只在原文件末尾追加修改过的对象，耗时与文件大小无关；文档
+    结构损坏（打开时已修复）等无法增量保存的情况下改为完整保存。完整保存
+    先写入临时文件再替换，因此输出路径可以与输入相同。
+    
+    Returns:
+        是否为增量保存
+    """
+    if incremental and doc.can_save_incrementally():
+        doc.save(doc.name, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+        doc.close()
+        return True
+    
+    try:
+        _replace_file(output_path, doc.save)
+    finally:
+        doc.close()
+    return False
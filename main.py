@@ -6,6 +6,7 @@ PDF工具箱 - 跨平台PDF处理应用
 
 import sys
 import os
+import multiprocessing
 
 def resource_path(relative_path):
     """获取资源文件的绝对路径，支持 PyInstaller 打包"""
@@ -65,4 +66,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # 打包后子进程（图片压缩进程池）需要
+    multiprocessing.freeze_support()
     main()
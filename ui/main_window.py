@@ -10,7 +10,7 @@ from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QLabel, QPushButton, QStackedWidget, QScrollArea,
     QFrame, QGridLayout, QMessageBox, QFileDialog,
-    QSpinBox, QComboBox, QLineEdit, QListWidget, QListWidgetItem,
+    QSpinBox, QDoubleSpinBox, QComboBox, QLineEdit, QListWidget, QListWidgetItem,
     QProgressBar, QCheckBox, QSplitter, QGraphicsView, QGraphicsScene,
     QGraphicsPixmapItem
 )
@@ -30,6 +30,8 @@ TOOLS = {
     "delete_pages": {"icon": "🗑️", "title": "删除页面", "category": "整理"},
     "extract_pages": {"icon": "📤", "title": "提取页面", "category": "整理"},
     "reorder": {"icon": "📋", "title": "重排页面", "category": "整理"},
+    "dedupe_pages": {"icon": "🧬", "title": "去除重复页", "category": "整理"},
+    "remove_blank": {"icon": "📄", "title": "删除空白页", "category": "整理"},
     "pdf_to_word": {"icon": "📝", "title": "PDF转Word", "category": "转换"},
     "pdf_to_excel": {"icon": "📊", "title": "PDF转Excel", "category": "转换"},
     "pdf_to_ppt": {"icon": "📽️", "title": "PDF转PPT", "category": "转换"},
@@ -158,6 +160,22 @@ class PageSelectorWidget(QWidget):
         
         top_layout.addStretch()
         
+        self.range_input = QLineEdit()
+        self.range_input.setPlaceholderText("按范围选择，如 1-5, odd, last")
+        self.range_input.setFixedWidth(200)
+        self.range_input.setStyleSheet("""
+            QLineEdit {
+                background-color: #ffffff;
+                color: #1e2537;
+                border: 1px solid #d0d8e0;
+                border-radius: 4px;
+                padding: 4px 8px;
+                font-size: 12px;
+            }
+        """)
+        self.range_input.returnPressed.connect(self.select_by_spec)
+        top_layout.addWidget(self.range_input)
+        
         self.select_all_btn = QPushButton("全选")
         self.select_all_btn.setStyleSheet("""
             QPushButton {
@@ -284,6 +302,25 @@ class PageSelectorWidget(QWidget):
         self.update_count()
         self.selection_changed.emit(sorted(list(self.selected_pages)))
     
+    def select_by_spec(self):
+        """按输入的范围字符串选择页面"""
+        from core.split import PageSelection
+        
+        spec = self.range_input.text().strip()
+        if not spec or not self.total_pages:
+            return
+        try:
+            selection = PageSelection(spec, self.total_pages)
+        except ValueError as e:
+            self.count_label.setText(str(e))
+            return
+        self.selected_pages = set(selection)
+        for i, item in enumerate(self.page_items):
+            item.set_selected(i in self.selected_pages)
+        self.update_visual_rotation()
+        self.update_count()
+        self.selection_changed.emit(sorted(list(self.selected_pages)))
+    
     def clear_selection(self):
         """清除选择"""
         self.selected_pages.clear()
@@ -309,6 +346,11 @@ class PageSelectorWidget(QWidget):
     def get_selected_pages_0indexed(self):
         """获取选中的页面列表（0-indexed）"""
         return sorted(list(self.selected_pages))
+    
+    def get_page_spec(self):
+        """获取选中页面的紧凑范围字符串，如 "1-3,7" """
+        from core.split import format_page_spec
+        return format_page_spec(sorted(self.selected_pages))
 
 
 class DraggablePageItem(QFrame):
@@ -597,6 +639,7 @@ class MultiFilePreviewWidget(QWidget):
         super().__init__(parent)
         self.file_paths = []
         self.thumbnails = []
+        self.range_inputs = []
         self.selected_index = -1
         self.init_ui()
     
@@ -605,7 +648,7 @@ class MultiFilePreviewWidget(QWidget):
         layout.setContentsMargins(0, 10, 0, 10)
         
         # 提示文字
-        hint = QLabel("点击选择文件，使用按钮调整合并顺序")
+        hint = QLabel("点击选择文件，使用按钮调整合并顺序，可为每个文件填写页面范围")
         hint.setStyleSheet("color: #6b7280; font-size: 12px;")
         layout.addWidget(hint)
         
@@ -669,8 +712,8 @@ class MultiFilePreviewWidget(QWidget):
         scroll.setWidgetResizable(True)
         scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         scroll.setStyleSheet("QScrollArea { border: none; background: transparent; }")
-        scroll.setMinimumHeight(180)
-        scroll.setMaximumHeight(250)
+        scroll.setMinimumHeight(205)
+        scroll.setMaximumHeight(275)
         
         self.container = QWidget()
         self.grid_layout = QHBoxLayout(self.container)
@@ -712,7 +755,7 @@ class MultiFilePreviewWidget(QWidget):
     def create_thumbnail_item(self, index, pixmap, filename):
         """创建缩略图项"""
         frame = QFrame()
-        frame.setFixedSize(130, 160)
+        frame.setFixedSize(130, 185)
         frame.setCursor(Qt.CursorShape.PointingHandCursor)
         frame.setStyleSheet("""
             QFrame {
@@ -743,6 +786,23 @@ class MultiFilePreviewWidget(QWidget):
         name_label.setToolTip(filename)
         layout.addWidget(name_label)
         
+        # 页面范围
+        range_input = QLineEdit()
+        range_input.setPlaceholderText("全部页面")
+        range_input.setToolTip("要合并的页面，例如: 1-3, 5, last")
+        range_input.setStyleSheet("""
+            QLineEdit {
+                background-color: #ffffff;
+                color: #1e2537;
+                border: 1px solid #d0d8e0;
+                border-radius: 4px;
+                padding: 2px 4px;
+                font-size: 10px;
+            }
+        """)
+        layout.addWidget(range_input)
+        self.range_inputs.append(range_input)
+        
         # 点击事件
         frame.mousePressEvent = lambda e, idx=index: self.on_item_clicked(idx)
         
@@ -799,6 +859,7 @@ class MultiFilePreviewWidget(QWidget):
         """交换两个文件"""
         self.file_paths[i], self.file_paths[j] = self.file_paths[j], self.file_paths[i]
         self.thumbnails[i], self.thumbnails[j] = self.thumbnails[j], self.thumbnails[i]
+        self.range_inputs[i], self.range_inputs[j] = self.range_inputs[j], self.range_inputs[i]
         self.refresh_layout()
         self.files_reordered.emit(self.file_paths)
     
@@ -808,6 +869,7 @@ class MultiFilePreviewWidget(QWidget):
             self.file_paths.pop(self.selected_index)
             old_thumb = self.thumbnails.pop(self.selected_index)
             old_thumb.deleteLater()
+            self.range_inputs.pop(self.selected_index)
             
             self.selected_index = -1
             self.update_buttons()
@@ -828,12 +890,21 @@ class MultiFilePreviewWidget(QWidget):
         for thumb in self.thumbnails:
             thumb.deleteLater()
         self.thumbnails = []
+        self.range_inputs = []
         self.file_paths = []
         self.selected_index = -1
     
     def get_files(self):
         """获取当前文件列表"""
         return self.file_paths
+    
+    def get_inputs(self):
+        """获取合并输入列表，填写了页面范围的文件返回 (路径, 范围)"""
+        inputs = []
+        for i, path in enumerate(self.file_paths):
+            spec = self.range_inputs[i].text().strip() if i < len(self.range_inputs) else ""
+            inputs.append((path, spec) if spec else path)
+        return inputs
 
 
 class PagePreviewWidget(QWidget):
@@ -1334,7 +1405,7 @@ class MainWindow(QMainWindow):
     
     def is_multi_file_tool(self, tool_id):
         """判断是否为多文件工具"""
-        return tool_id in ["merge", "jpg_to_pdf"]
+        return tool_id in ["merge", "jpg_to_pdf", "dedupe_pages"]
     
     def create_options_widget(self, tool_id):
         """创建工具选项区域"""
@@ -1354,13 +1425,35 @@ class MainWindow(QMainWindow):
             combo.setFixedWidth(200)
             layout.addWidget(combo)
             
+            target_label = QLabel("目标大小：")
+            target_label.setStyleSheet("color: #1e2537; margin-left: 20px;")
+            layout.addWidget(target_label)
+            
+            target_size = QSpinBox()
+            target_size.setRange(0, 2048)
+            target_size.setValue(0)
+            target_size.setSuffix(" MB")
+            target_size.setSpecialValueText("不限")
+            target_size.setObjectName("compress_target")
+            layout.addWidget(target_size)
+            
+            optimize_check = QCheckBox("精简字体和资源")
+            optimize_check.setObjectName("compress_optimize")
+            optimize_check.setStyleSheet("color: #1e2537; margin-left: 20px;")
+            layout.addWidget(optimize_check)
+            
+            mrc_check = QCheckBox("扫描页分层压缩")
+            mrc_check.setObjectName("compress_mrc")
+            mrc_check.setStyleSheet("color: #1e2537; margin-left: 10px;")
+            layout.addWidget(mrc_check)
+            
         elif tool_id == "split":
             label = QLabel("分割方式：")
             label.setStyleSheet("color: #1e2537;")
             layout.addWidget(label)
             
             combo = QComboBox()
-            combo.addItems(["每页一个文件", "按范围分割", "每N页一个文件"])
+            combo.addItems(["每页一个文件", "按范围分割", "每N页一个文件", "按文件大小分割", "按书签分割", "按空白页分割", "按文字匹配分割"])
             combo.setObjectName("split_mode")
             combo.setFixedWidth(180)
             layout.addWidget(combo)
@@ -1370,18 +1463,52 @@ class MainWindow(QMainWindow):
             layout.addWidget(range_label)
             
             range_input = QLineEdit()
-            range_input.setPlaceholderText("例如: 1-3, 5, 7-10")
+            range_input.setPlaceholderText("例如: 1-3, 5, 10-8, odd, last")
             range_input.setObjectName("split_range")
             range_input.setFixedWidth(200)
             layout.addWidget(range_input)
             
+            size_label = QLabel("单个文件上限：")
+            size_label.setStyleSheet("color: #1e2537; margin-left: 20px;")
+            layout.addWidget(size_label)
+            
+            size_input = QDoubleSpinBox()
+            size_input.setRange(0.1, 2048)
+            size_input.setDecimals(1)
+            size_input.setValue(9.5)
+            size_input.setSuffix(" MB")
+            size_input.setObjectName("split_size")
+            layout.addWidget(size_input)
+            
+            level_label = QLabel("书签层级：")
+            level_label.setStyleSheet("color: #1e2537; margin-left: 20px;")
+            layout.addWidget(level_label)
+            
+            level_input = QSpinBox()
+            level_input.setRange(1, 9)
+            level_input.setValue(1)
+            level_input.setObjectName("split_toc_level")
+            layout.addWidget(level_input)
+            
+            drop_blank_check = QCheckBox("丢弃空白页")
+            drop_blank_check.setChecked(True)
+            drop_blank_check.setObjectName("split_drop_blank")
+            drop_blank_check.setStyleSheet("color: #1e2537; margin-left: 20px;")
+            layout.addWidget(drop_blank_check)
+            
+            pattern_input = QLineEdit()
+            pattern_input.setPlaceholderText("文字规则（正则），例如: 发票号码[:：]\\s*(\\d+)")
+            pattern_input.setObjectName("split_pattern")
+            pattern_input.setFixedWidth(260)
+            layout.addWidget(pattern_input)
+            
         elif tool_id == "rotate":
             label = QLabel("旋转角度：")
             label.setStyleSheet("color: #1e2537;")
             layout.addWidget(label)
             
             combo = QComboBox()
-            combo.addItems(["顺时针90°", "180°", "逆时针90°"])
+            combo.addItems(["顺时针90°", "180°", "逆时针90°", "自动识别方向"])
             combo.setObjectName("rotate_angle")
             combo.setFixedWidth(150)
             
@@ -1389,12 +1516,47 @@ class MainWindow(QMainWindow):
             def update_preview(index):
                 page = self.tool_pages.get(tool_id)
                 if page and hasattr(page, 'page_selector'):
-                    angles = [90, 180, 270]
+                    angles = [90, 180, 270, 0]
                     page.page_selector.set_preview_rotation(angles[index])
             
             combo.currentIndexChanged.connect(update_preview)
             layout.addWidget(combo)
             
+            incremental_check = QCheckBox("增量保存（大文件更快）")
+            incremental_check.setObjectName("save_incremental")
+            incremental_check.setStyleSheet("color: #1e2537; margin-left: 20px;")
+            layout.addWidget(incremental_check)
+            
+        elif tool_id == "crop":
+            auto_check = QCheckBox("自动裁剪到内容，留白：")
+            auto_check.setObjectName("crop_auto")
+            auto_check.setStyleSheet("color: #1e2537;")
+            layout.addWidget(auto_check)
+            
+            padding_input = QSpinBox()
+            padding_input.setRange(0, 100)
+            padding_input.setValue(10)
+            padding_input.setSuffix(" pt")
+            padding_input.setObjectName("crop_padding")
+            padding_input.setFixedWidth(80)
+            layout.addWidget(padding_input)
+            
+            incremental_check = QCheckBox("增量保存（大文件更快）")
+            incremental_check.setObjectName("save_incremental")
+            incremental_check.setStyleSheet("color: #1e2537; margin-left: 20px;")
+            layout.addWidget(incremental_check)
+            
+        elif tool_id == "dedupe_pages":
+            report_check = QCheckBox("只检查，不删除")
+            report_check.setObjectName("dedupe_report_only")
+            report_check.setStyleSheet("color: #1e2537;")
+            layout.addWidget(report_check)
+            
+        elif tool_id == "remove_blank":
+            report_check = QCheckBox("只检查，不删除")
+            report_check.setObjectName("blank_report_only")
+            report_check.setStyleSheet("color: #1e2537;")
+            layout.addWidget(report_check)
 
         elif tool_id == "watermark":
             label = QLabel("水印文字：")
@@ -1539,7 +1701,7 @@ class MainWindow(QMainWindow):
                 if tool_id == "rotate":
                     combo = page.findChild(QComboBox, "rotate_angle")
                     if combo:
-                        angles = [90, 180, 270]
+                        angles = [90, 180, 270, 0]
                         page.page_selector.set_preview_rotation(angles[combo.currentIndex()])
         # 加载PDF预览（单文件非合并非页面选择工具）
         elif len(files) == 1 and files[0].lower().endswith('.pdf') and tool_id != "merge":
@@ -1592,9 +1754,14 @@ class MainWindow(QMainWindow):
         page.progress.setVisible(True)
         page.process_btn.setEnabled(False)
         
+        # 合并时带上每个文件的页面范围
+        files = self.current_files
+        if tool_id == "merge" and hasattr(page, 'merge_preview'):
+            files = page.merge_preview.get_inputs()
+        
         # 执行处理
         try:
-            self.execute_tool(tool_id, self.current_files, output_path, options, page)
+            self.execute_tool(tool_id, files, output_path, options, page)
         except Exception as e:
             QMessageBox.critical(self, "错误", f"处理失败：{str(e)}")
             page.progress.setVisible(False)
@@ -1614,6 +1781,8 @@ class MainWindow(QMainWindow):
             "delete_pages": "_deleted.pdf",
             "extract_pages": "_extracted.pdf",
             "reorder": "_reordered.pdf",
+            "dedupe_pages": "_deduped.pdf",
+            "remove_blank": "_noblank.pdf",
             "pdf_to_word": ".docx",
             "pdf_to_excel": ".xlsx",
             "pdf_to_ppt": ".pptx",
@@ -1645,42 +1814,91 @@ class MainWindow(QMainWindow):
         
         if tool_id == "compress":
             combo = page.findChild(QComboBox, "compress_level")
+            target_size = page.findChild(QSpinBox, "compress_target")
+            optimize_check = page.findChild(QCheckBox, "compress_optimize")
+            mrc_check = page.findChild(QCheckBox, "compress_mrc")
             if combo:
                 options["level"] = combo.currentIndex()
+            if target_size and target_size.value() > 0:
+                options["target_bytes"] = target_size.value() * 1024 * 1024
+            if optimize_check:
+                options["optimize_resources"] = optimize_check.isChecked()
+            if mrc_check:
+                options["mrc"] = mrc_check.isChecked()
         
         elif tool_id == "split":
             combo = page.findChild(QComboBox, "split_mode")
             range_input = page.findChild(QLineEdit, "split_range")
+            size_input = page.findChild(QDoubleSpinBox, "split_size")
+            level_input = page.findChild(QSpinBox, "split_toc_level")
+            drop_blank_check = page.findChild(QCheckBox, "split_drop_blank")
+            pattern_input = page.findChild(QLineEdit, "split_pattern")
             if combo:
                 options["mode"] = combo.currentIndex()
             if range_input:
                 options["range"] = range_input.text()
+            if size_input and options.get("mode") == 3:
+                options["max_bytes"] = int(size_input.value() * 1024 * 1024)
+            if level_input and options.get("mode") == 4:
+                options["toc_level"] = level_input.value()
+            if drop_blank_check and options.get("mode") == 5:
+                options["drop_blank"] = drop_blank_check.isChecked()
+            if pattern_input and options.get("mode") == 6:
+                options["pattern"] = pattern_input.text()
         
         elif tool_id == "rotate":
             combo = page.findChild(QComboBox, "rotate_angle")
             if combo:
                 angles = [90, 180, 270]
-                options["angle"] = angles[combo.currentIndex()]
+                if combo.currentIndex() < len(angles):
+                    options["angle"] = angles[combo.currentIndex()]
+                else:
+                    options["auto"] = True
             # 从页面选择器获取选中页面
             if hasattr(page, 'page_selector'):
-                selected = page.page_selector.get_selected_pages()
+                selected = page.page_selector.get_page_spec()
                 if selected:
-                    options["pages"] = ",".join(str(p) for p in selected)
+                    options["pages"] = selected
+            incremental_check = page.findChild(QCheckBox, "save_incremental")
+            if incremental_check:
+                options["incremental"] = incremental_check.isChecked()
+        
+        elif tool_id == "crop":
+            auto_check = page.findChild(QCheckBox, "crop_auto")
+            padding_input = page.findChild(QSpinBox, "crop_padding")
+            if auto_check and auto_check.isChecked():
+                options["auto"] = True
+                if padding_input:
+                    options["padding"] = padding_input.value()
+            incremental_check = page.findChild(QCheckBox, "save_incremental")
+            if incremental_check:
+                options["incremental"] = incremental_check.isChecked()
         
         elif tool_id in ["delete_pages", "extract_pages"]:
             # 从页面选择器获取选中页面
             if hasattr(page, 'page_selector'):
-                selected = page.page_selector.get_selected_pages()
+                selected = page.page_selector.get_page_spec()
                 if selected:
-                    options["pages"] = ",".join(str(p) for p in selected)
+                    options["pages"] = selected
+        
+        elif tool_id == "dedupe_pages":
+            report_check = page.findChild(QCheckBox, "dedupe_report_only")
+            if report_check:
+                options["report_only"] = report_check.isChecked()
+        
+        elif tool_id == "remove_blank":
+            report_check = page.findChild(QCheckBox, "blank_report_only")
+            if report_check:
+                options["report_only"] = report_check.isChecked()
         
         elif tool_id == "reorder":
             # 获取重排后的顺序
             if hasattr(page, 'reorder_widget'):
                 order = page.reorder_widget.get_order()
                 if order:
-                    # 转换为1-indexed的字符串
-                    options["order"] = ",".join(str(i + 1) for i in order)
+                    from core.split import format_page_spec
+                    # 转换为1-indexed的紧凑范围字符串（保持顺序）
+                    options["order"] = format_page_spec(order)
         
         elif tool_id == "watermark":
             text_input = page.findChild(QLineEdit, "watermark_text")
@@ -1720,7 +1938,7 @@ class MainWindow(QMainWindow):
     
     def execute_tool(self, tool_id, files, output_path, options, page):
         """执行工具操作"""
-        from core import compress, merge, split, rotate, pages, convert, watermark, security, ocr
+        from core import compress, merge, split, rotate, pages, convert, watermark, security, ocr, cache
         
         func_map = {
             "compress": compress.compress_pdf,
@@ -1730,6 +1948,8 @@ class MainWindow(QMainWindow):
             "delete_pages": pages.delete_pages,
             "extract_pages": pages.extract_pages,
             "reorder": pages.reorder_pages,
+            "dedupe_pages": pages.remove_duplicate_pages,
+            "remove_blank": pages.remove_blank_pages,
             "pdf_to_word": convert.pdf_to_word,
             "pdf_to_excel": convert.pdf_to_excel,
             "pdf_to_ppt": convert.pdf_to_ppt,
@@ -1749,6 +1969,11 @@ class MainWindow(QMainWindow):
         if not func:
             raise ValueError(f"未知工具: {tool_id}")
         
+        # 相同输入和参数直接使用缓存结果（加密/解密结果不写入缓存，
+        # 增量保存直接在输出文件上追加，不经过缓存）
+        if tool_id not in ("encrypt", "decrypt") and not options.get("incremental"):
+            func = cache.cached(func)
+        
         # 在后台线程执行
         self.worker = WorkerThread(func, files[0] if len(files) == 1 else files, output_path, **options)
         self.worker.progress.connect(lambda v: page.progress.setValue(v))